@@ -2,11 +2,15 @@
 Provides the Parabola Class, mainly used for Voronoi calculation
 """
 import logging as root_logger
+from math import sqrt, isclose
 import numpy as np
 from .Quadratic import Quadratic as Q
 
 logging = root_logger.getLogger(__name__)
 MAX = 5000
+#Tolerances for a focus being on the directrix, as np.allclose defaults
+RTOL = 1e-5
+ATOL = 1e-8
 
 class Parabola:
     """ A class to represent and calculate a parabola. holds both forms of definition,
@@ -27,10 +31,11 @@ class Parabola:
         #focal parameter: the distance from vertex to focus/directrix
         self.p = 0.5 * (self.fy - self.d)
         #Vertex form: y = a(x-h)^2 + k
-        if np.allclose(self.fy, self.d):
+        if isclose(self.fy, self.d, rel_tol=RTOL, abs_tol=ATOL):
             self.va = 0
         else:
             self.va = 1/(2*(self.fy-self.d))
+            self.vertical_line = False
         self.vh = -self.fx
         self.vk = self.fy - self.p
         #standard form: y = ax^2 + bx + c
@@ -56,7 +61,7 @@ class Parabola:
         self.d = d
         self.p = 0.5 * (self.fy - self.d)
         #Vertex form parameters:
-        if np.allclose(self.fy, self.d):
+        if isclose(self.fy, self.d, rel_tol=RTOL, abs_tol=ATOL):
             self.va = 0
             self.vertical_line = True
         else:
@@ -70,10 +75,11 @@ class Parabola:
 
     def intersect(self, p2, d=None):
         """ Take the quadratic representations of parabolas, and
-            get the 0, 1 or 2 points that are the intersections
+            get the 0, 1 or 2 points that are the intersections.
+            If a directrix d is passed in, both parabolas are updated to it first
         """
         assert(isinstance(p2, Parabola))
-        if d:
+        if d is not None:
             self.update_d(d)
             p2.update_d(d)
         #degenerate cases:
@@ -91,6 +97,15 @@ class Parabola:
         xys = self(xs)
         return xys
 
+    def breakpoint(self, right, d=None):
+        """ Get the x position of the breakpoint between this parabola,
+            on the left, and another on the right. Does not modify either parabola
+        """
+        assert(isinstance(right, Parabola))
+        if d is None:
+            d = self.d
+        return breakpoint_x(self.fx, self.fy, right.fx, right.fy, d)
+
     def calcStandardForm(self, x):
         """ Get the y value of the parabola at an x position using the standard
             form equation. Should equal calcVertexForm(x)
@@ -158,3 +173,69 @@ class Parabola:
             -b/(2*a),
             c-(a * (pow(b, 2) / 4 * a))
         ]
+
+
+def breakpoint_x(lfx, lfy, rfx, rfy, d):
+    """ Scalar kernel for the x position of the breakpoint between two arcs
+    of a beachline, given their foci and the directrix d.
+    Equivalent to intersecting the parabolas and choosing the intersection
+    that has the left arc on its left, without constructing any arrays.
+    """
+    lk = lfy - d
+    rk = rfy - d
+    #degenerate cases: a focus on the directrix is a vertical line
+    if isclose(rfy, d, rel_tol=RTOL, abs_tol=ATOL):
+        return rfx
+    if isclose(lfy, d, rel_tol=RTOL, abs_tol=ATOL):
+        return lfx
+    #same height: the breakpoint is halfway between the foci
+    if isclose(lfy, rfy, rel_tol=RTOL, abs_tol=ATOL):
+        return 0.5 * (lfx + rfx)
+    #rk(x-lfx)^2 - lk(x-rfx)^2 + lk*rk*(lfy-rfy) = 0, solved for x:
+    dx = lfx - rfx
+    dy = lfy - rfy
+    offset = sqrt(max(0.0, lk * rk * (dx * dx + dy * dy)))
+    base = rk * lfx - lk * rfx
+    denominator = rk - lk
+    xa = (base + offset) / denominator
+    xb = (base - offset) / denominator
+    #a higher left arc is cut from the left by the lower right arc
+    if lfy > rfy:
+        return min(xa, xb)
+    return max(xa, xb)
+
+
+class BreakpointCache:
+    """ Memoises breakpoint x positions, keyed by the ids of the
+    left and right arcs, for a single sweep line position.
+    Moving the sweep line discards the stored breakpoints.
+    """
+
+    def __init__(self, d=None):
+        self.d = d
+        self.breakpoints = {}
+
+    def __len__(self):
+        return len(self.breakpoints)
+
+    def update_d(self, d):
+        """ Move the sweep line, invalidating stored breakpoints """
+        if d != self.d:
+            self.breakpoints.clear()
+        self.d = d
+
+    def clear(self):
+        self.breakpoints.clear()
+
+    def get(self, left, right, d=None):
+        """ Get the breakpoint x position of two parabolas,
+            calculating it if it isn't stored already
+        """
+        if d is None:
+            d = self.d
+        if d is None:
+            d = left.d
+        key = (left.id, right.id, d)
+        if key not in self.breakpoints:
+            self.breakpoints[key] = breakpoint_x(left.fx, left.fy, right.fx, right.fy, d)
+        return self.breakpoints[key]
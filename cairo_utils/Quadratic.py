@@ -1,8 +1,11 @@
-from math import sqrt, trunc
+from math import sqrt, trunc, isclose
 import numpy as np
 import logging
 import IPython
 
+#Tolerance for treating a scalar as zero, as np.allclose default
+ATOL = 1e-8
+
 class Quadratic(object):
     """ A Class to hold a quadratic equation 
     (y = ax^2 + bx + c)
@@ -45,17 +48,17 @@ class Quadratic(object):
         denominator = 2 * self.a
         if D < 0:
             returnVal = [None,None]
-        elif np.allclose(D,0) or np.allclose(self.a,0):
+        elif isclose(D, 0, abs_tol=ATOL) or isclose(self.a, 0, abs_tol=ATOL):
             logging.debug('Only one intersection')
-            #using mullers method:
-            twoc = -2 * self.c
+            #using mullers method: x = 2c / (-b -+ sqrt(D))
+            twoc = 2 * self.c
             sqrtD = sqrt(D)
-            pos = (-self.b) + sqrtD
             neg = (-self.b) - sqrtD
-            if pos != 0:
-                x = twoc / pos
-            elif neg != 0:
+            pos = (-self.b) + sqrtD
+            if neg != 0:
                 x = twoc / neg
+            elif pos != 0:
+                x = twoc / pos
             else:
                 logging.debug("Not even one intersection")
                 x = None
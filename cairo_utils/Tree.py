@@ -1,37 +1,54 @@
+from .rbtree.RBTree import RBTree
+from .rbtree.ComparisonFunctions import Directions
+
 class Tree:
     """ A Simple Binary Tree Class. Trees are nodes themselves.
     Each node can hold a *value* (used for searching, ordering etc),
     and *data*, that can be anything, especially a dictionary.
+    A balanced tree keeps its nodes in an RBTree instead of left and right
     """
-    
-    def __init__(self,value,root=False,data=None):
+
+    def __init__(self,value,root=False,data=None,balanced=False):
         self.value = value
         self.data = data
         self.left = None
         self.right = None
         self.root = root
+        self.balanced = balanced
+        self._rbtree = None
+        if balanced:
+            self._rbtree = RBTree(key=_tree_key)
+            self._rbtree.insert(self)
 
     def isLeaf(self):
+        if self.balanced:
+            return len(self._rbtree) == 1
         return self.left is None and self.right is None
 
     def isRoot(self):
         return self.root
 
     def insert(self,value,data=None):
-        insertOnLeft = value < self.value
-        if insertOnLeft:
-            if self.left is None:
-                self.left = Tree(value,data=data)
+        if self.balanced:
+            self._rbtree.insert(Tree(value,data=data))
+            return
+        current = self
+        while True:
+            if value < current.value:
+                if current.left is None:
+                    current.left = Tree(value,data=data)
+                    return
+                current = current.left
             else:
-                self.left.insert(value,data=data)
-        else:
-            if self.right is None:
-                self.right = Tree(value,data=data)
-            else:
-                self.right.insert(value,data=data)
+                if current.right is None:
+                    current.right = Tree(value,data=data)
+                    return
+                current = current.right
+
 
-                
     def __str__(self):
+        if self.balanced:
+            return "( V: {} Balanced Len: {} )".format(self.value, len(self._rbtree))
         if self.left is not None:
             leftString = self.left.__str__()
         else:
@@ -39,36 +56,57 @@ class Tree:
         if self.right is not None:
             rightString = self.right.__str__()
         else:
-            rightString = "()"            
+            rightString = "()"
         return "( V: {} Left: {},Right: {} )".format(self.value,leftString,rightString)
 
 
     def search(self,value):
-        if value == self.value:
-            return self
-        elif self.isLeaf():
-            return None
-        elif value < self.value:
-            if self.left is None:
-                return None
+        if self.balanced:
+            node, direction = self._rbtree.search(value)
+            return None if node is None else node.value
+        current = self
+        while current is not None:
+            if value == current.value:
+                return current
+            elif value < current.value:
+                current = current.left
             else:
-                return self.left.search(value)
-        else:
-            if self.right is None:
-                return None
-            else:
-                return self.right.search(value)
+                current = current.right
+        return None
 
     def getRange(self,l,r):
-        values = []
-        if l < self.value and self.left is not None:
-            values.extend(self.left.getRange(l,r))
+        return list(self.iter_range(l,r))
+
+    def iter_range(self,l,r):
+        """ Lazily iterate the nodes with values where l < value <= r, in order """
+        if self.balanced:
+            for node in self._rbtree.iter_range(l, r, cmpFunc=_range_comparison):
+                yield node.value
+            return
+        stack = []
+        current = self
+        while bool(stack) or current is not None:
+            #only descend left while smaller values can be in range
+            while current is not None:
+                stack.append(current)
+                current = current.left if l < current.value else None
+            current = stack.pop()
+            if l < current.value and current.value <= r:
+                yield current
+            current = current.right if current.value <= r else None
+
 
-        if l < self.value and self.value <= r:
-            values.append(self)
-            
-        if self.value <= r and self.right is not None:
-            values.extend(self.right.getRange(l,r))
+#--------------------
+# PRIVATE FUNCTIONS
+#--------------------
+def _tree_key(x):
+    """ Key of a balanced Tree's nodes, and of values searched for """
+    if isinstance(x, Tree):
+        return x.value
+    return x
 
-        return values
-            
+def _range_comparison(a, b, compData):
+    """ Places nodes at or below a bound before it, for the (l, r] range """
+    if a.key <= b:
+        return Directions.RIGHT
+    return Directions.LEFT
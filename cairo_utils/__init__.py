@@ -14,6 +14,7 @@ from .make_gif import Make_Gif
 from . import drawing
 from . import math
 from . import easings
+from . import trace
 
 _AUTHOR = "jgrey"
 _VERSION = "0.1.3"
@@ -3,6 +3,7 @@ from ..drawing import drawRect, drawCircle, clear_canvas, drawText
 
 class Drawable:
     """ A Basic Drawable Superclass """
+    __slots__ = ()
 
     def __init__(self):
         raise Exception("Drawable Should not be instantiated")
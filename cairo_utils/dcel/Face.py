@@ -16,6 +16,7 @@ from .HalfEdge import HalfEdge
 from .Drawable import Drawable
 from ..constants import TWOPI
 from .. import math as cumath
+from .. import trace
 from ..math import rotatePoint, calc_bbox_corner, within_bbox
 
 logging = root_logger.getLogger(__name__)
@@ -23,7 +24,8 @@ logging = root_logger.getLogger(__name__)
 class Face(Drawable):
     """ A Face with a start point for its outer component list,
     and all of its inner components """
-
+    __slots__ = ("site", "_edgeList", "coord_list", "markedForCleanup", "_data", "dcel",
+                 "_free_vertices", "index")
     nextIndex = 0
 
     def __init__(self, site=None, index=None, data=None, dcel=None):
@@ -32,35 +34,56 @@ class Face(Drawable):
             assert(isinstance(site, np.ndarray))
         #Site is the voronoi point that the face is built around
         self.site = site
-        #Primary list of ccw edges for this face
-        self.edgeList = []
+        #Primary list of ccw edges for this face, created on first access
+        self._edgeList = None
         self.coord_list = None
         #mark face for cleanup:
         self.markedForCleanup = False
-        #Additional Data:
-        self.data = {}
+        #Additional Data, created on first access:
+        self._data = None
         if data is not None:
-            self.data.update(data)
+            self._data = dict(data)
         self.dcel = dcel
 
-        #free vertices to build a convex hull from:
-        self.free_vertices = set()
+        #free vertices to build a convex hull from, created on first access:
+        self._free_vertices = None
         
         if index is None:
-            logging.debug("Creating Face {}".format(Face.nextIndex))
             self.index = Face.nextIndex
             Face.nextIndex += 1
         else:
             assert(isinstance(index, int))
-            logging.debug("Re-creating Face: {}".format(index))
             self.index = index
             if self.index >= Face.nextIndex:
                 Face.nextIndex = self.index + 1
+        if trace.ENABLED:
+            trace.event("face.new", index=self.index, recreated=index is not None)
                 
         if self.dcel is not None and self not in self.dcel.faces:
             self.dcel.faces.add(self)
 
-                
+    @property
+    def edgeList(self):
+        if self._edgeList is None:
+            self._edgeList = []
+        return self._edgeList
+
+    @edgeList.setter
+    def edgeList(self, edges):
+        self._edgeList = edges
+
+    @property
+    def free_vertices(self):
+        if self._free_vertices is None:
+            self._free_vertices = set()
+        return self._free_vertices
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = {}
+        return self._data
+
     def copy(self):
         with self.dcel:
             #copy the halfedges
@@ -184,9 +207,9 @@ class Face(Drawable):
             v1, v2 = x.getVertices()
             assert(v1 is not None)
             assert(v2 is not None)
-            logging.debug("Drawing Face {} edge {}".format(self.index, x.index))
-            logging.debug("Drawing Face edge from ({}, {}) to ({}, {})".format(v1.loc[0], v1.loc[1],
-                                                                               v2.loc[0], v2.loc[1]))
+            if trace.ENABLED:
+                trace.event("face.draw_edge", face=self.index, edge=x.index,
+                            start=v1.loc, end=v2.loc)
             if initial:
                 ctx.move_to(*v1.loc)
                 initial = False
@@ -229,8 +252,8 @@ class Face(Drawable):
     def _export(self):
         """ Export identifiers rather than objects, to allow reconstruction """
         logging.debug("Exporting face: {}".format(self.index))
-        enumData = {a.name:b for a,b in self.data.items() if a in FaceE}
-        nonEnumData = {a:b for a,b in self.data.items() if a not in FaceE}
+        enumData = {a.name:b for a,b in self.data.items() if isinstance(a, FaceE)}
+        nonEnumData = {a:b for a,b in self.data.items() if not isinstance(a, FaceE)}
 
         return {
             'i' : self.index,
@@ -352,7 +375,7 @@ class Face(Drawable):
 
     def has_edges(self):
         """ Check if its a null face or has actual edges """
-        return bool(self.edgeList)
+        return bool(self._edgeList)
 
 
     #------------------------------
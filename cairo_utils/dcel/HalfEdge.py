@@ -12,6 +12,7 @@ from .constants import EditE, EDGE_FOLLOW_GUARD, EdgeE, SampleFormE
 from .Vertex import Vertex
 from .Line import Line
 from .Drawable import Drawable
+from .. import trace
 
 logging = root_logger.getLogger(__name__)
 
@@ -26,6 +27,8 @@ class HalfEdge(Drawable):
         Auto-maintains counter-clockwise vertex order with it's twin.
     	Two HalfEdges make an Edge
     """
+    __slots__ = ("origin", "twin", "length_sq", "face", "next", "prev", "dcel", "index",
+                 "markedForCleanup", "constrained", "drawn", "fixed", "_data")
     nextIndex = 0
 
     def __init__(self, origin=None, twin=None, index=None, data=None, dcel=None):
@@ -42,15 +45,15 @@ class HalfEdge(Drawable):
         self.dcel=dcel
 
         if index is None:
-            logging.debug("Creating Edge {}".format(HalfEdge.nextIndex))
             self.index = HalfEdge.nextIndex
             HalfEdge.nextIndex += 1
         else:
             assert(isinstance(index, int))
-            logging.debug("Re-creating Edge: {}".format(index))
             self.index = index
             if self.index >= HalfEdge.nextIndex:
                 HalfEdge.nextIndex = self.index + 1
+        if trace.ENABLED:
+            trace.event("halfedge.new", index=self.index, recreated=index is not None)
 
         #register the halfedge with the vertex
         if origin is not None:
@@ -61,12 +64,19 @@ class HalfEdge(Drawable):
         self.constrained = False
         self.drawn = False
         self.fixed = False
-        self.data = {}
+        #created on first access of data:
+        self._data = None
         if data is not None:
-            self.data.update(data)
+            self._data = dict(data)
         if self.dcel is not None and self not in self.dcel.halfEdges:
             self.dcel.halfEdges.add(self)
 
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = {}
+        return self._data
+
     def eq_verts(self, other):
         assert(isinstance(other, HalfEdge))
         sVerts = self.getVertices()
@@ -113,8 +123,8 @@ class HalfEdge(Drawable):
             nextHE = self.next.index
         if self.prev is not None:
             prevHE = self.prev.index
-        enumData = {a.name:b for a,b in self.data.items() if a in EdgeE}
-        nonEnumData = {a:b for a,b in self.data.items() if a not in EdgeE}
+        enumData = {a.name:b for a,b in self.data.items() if isinstance(a, EdgeE)}
+        nonEnumData = {a:b for a,b in self.data.items() if not isinstance(a, EdgeE)}
 
             
         return {
@@ -158,7 +168,6 @@ class HalfEdge(Drawable):
         return "(HE: {}, f: {}, O: {}, T: {}, P: {}, N: {}, XY: {})".format(*data)
 
     def draw(self, ctx, data_override=None, clear=False, text=False, width=None):
-        logging.debug("Drawing Edge: {} | {}".format(self.index, self.twin.index))
         if clear:
             clear_canvas(ctx)
         data = self.data.copy()
@@ -214,11 +223,9 @@ class HalfEdge(Drawable):
             #early exit if line is not completed
             return
         centre = get_midpoint(v1.toArray(), v2.toArray())
-        logging.debug("Drawing HalfEdge {} : {}, {} - {}, {}".format(self.index,
-                                                                     v1.loc[0],
-                                                                     v1.loc[1],
-                                                                     v2.loc[0],
-                                                                     v2.loc[1]))
+        if trace.ENABLED:
+            trace.event("halfedge.draw", index=self.index, twin=self.twin.index,
+                        start=v1.loc, end=v2.loc, bezier=bool(bezier))
         sample_data = None
         if sampleDescr is not None:
             #draw as a sampled line
@@ -233,7 +240,6 @@ class HalfEdge(Drawable):
         #draw as a line/curve
         #todo: allow beziers to be simplified to straight lines
         if bool(bezier):
-            logging.debug("Drawing Bezier: {}".format(bezier))
             ctx.new_path()
             for b in bezier:
                 ctx.move_to(*b[0])
@@ -247,7 +253,6 @@ class HalfEdge(Drawable):
                     ctx.curve_to(*b[1], *b[2], *b[3])
 
         else:
-            logging.debug("Drawing Straight Line")
             ctx.move_to(*v1.loc)
             ctx.line_to(*v2.loc)
 
@@ -505,7 +510,7 @@ class HalfEdge(Drawable):
                 else:
                     d = self.twin.origin.data
                     target = self.twin
-                newVert = self.dcel.newVertex(intersect_coords, data=d)
+                newVert = self.dcel.newVertex(i_c, data=d)
                 target.replaceVertex(newVert)
         
 
@@ -9,6 +9,7 @@ from .constants import EditE, VertE, SampleE, SampleFormE
 from ..constants import TWOPI, D_EPSILON, TOLERANCE, VERTEX, VERTRAD, ALLCLOSE_TOLERANCE
 from ..math import inCircle, rotatePoint
 from ..drawing import drawRect, drawText, clear_canvas, drawCircle
+from .. import trace
 from .Drawable import Drawable
 
 logging = root_logger.getLogger(__name__)
@@ -17,22 +18,22 @@ class Vertex(Drawable):
     """ A Simple vertex for two dimensions.
     Has a pair of coordinates, and stores the edges associated with it. 
     """
-
+    __slots__ = ("_loc", "_halfEdges", "_data", "dcel", "markedForCleanup", "active", "index")
     nextIndex = 0
 
     def __init__(self, loc, edges=None, index=None, data=None, dcel=None, active=None):
         assert(isinstance(loc, np.ndarray))
         assert(edges is None or isinstance(edges, list))
 
-        self.loc = loc
-        #The edges this vertex is part of:
-        self.halfEdges = set()
+        self._loc = loc
+        #The edges this vertex is part of, created on first access:
+        self._halfEdges = None
         if edges is not None:
-            self.halfEdges.update(edges)
-        #Custom data of the vertex:
-        self.data = {}
+            self._halfEdges = set(edges)
+        #Custom data of the vertex, created on first access:
+        self._data = None
         if data is not None:
-            self.data.update(data)
+            self._data = dict(data)
         #Reference back to the dcel
         self.dcel = dcel
         self.markedForCleanup = False
@@ -43,21 +44,43 @@ class Vertex(Drawable):
             self.active = active
         
         if index is None:
-            logging.debug("Creating vertex {} at: {:.3f} {:.3f}".format(Vertex.nextIndex, loc[0], loc[1]))
             self.index = Vertex.nextIndex
             Vertex.nextIndex += 1
         else:
             assert(isinstance(index, int))
-            logging.debug("Re-Creating Vertex: {}".format(index))
             self.index = index
             if self.index >= Vertex.nextIndex:
                 Vertex.nextIndex = self.index + 1
+        if trace.ENABLED:
+            trace.event("vertex.new", index=self.index, loc=loc, recreated=index is not None)
 
         if self.dcel is not None and self not in self.dcel.vertices:
             self.dcel.vertices.add(self)
             self.dcel.vertex_quad_tree.insert(item=self, bbox=self.bbox())
 
-                
+
+    @property
+    def loc(self):
+        return self._loc
+
+    @loc.setter
+    def loc(self, loc):
+        """ Move the vertex, keeping the dcel's quad trees up to date """
+        self._loc = loc
+        if self.dcel is not None:
+            self.dcel.reindex_vertex(self)
+
+    @property
+    def halfEdges(self):
+        if self._halfEdges is None:
+            self._halfEdges = set()
+        return self._halfEdges
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = {}
+        return self._data
     
     def copy(self):
         """ Create an isolated copy of this vertex. Doesn't copy halfedge connections, 
@@ -75,8 +98,8 @@ class Vertex(Drawable):
     def _export(self):
         """ Export identifiers instead of objects to allow reconstruction """
         logging.debug("Exporting Vertex: {}".format(self.index))
-        enumData = {a.name:b for a,b in self.data.items() if a in VertE}
-        nonEnumData = {a:b for a,b in self.data.items() if a not in VertE}
+        enumData = {a.name:b for a,b in self.data.items() if isinstance(a, VertE)}
+        nonEnumData = {a:b for a,b in self.data.items() if not isinstance(a, VertE)}
         
         return {
             'i': self.index,
@@ -124,15 +147,15 @@ class Vertex(Drawable):
     def free_bbox(loc, e=D_EPSILON):
         """ Static method utility to create a bbox. used for quad_tree checking without creating the vertex """
         assert(isinstance(loc, np.ndarray))
-        loc = loc.astype(np.float64)
-        return np.array([loc - e, loc + e]).flatten()
+        x, y = float(loc[0]), float(loc[1])
+        return np.array([x - e, y - e, x + e, y + e])
 
     #------------------------------
     #def queries
     #------------------------------
 
     def isEdgeless(self):
-        return len(self.halfEdges) == 0
+        return not bool(self._halfEdges)
     
     def has_constraints(self, candidateSet=None):
         """ if a vertex is used by more than  """
@@ -184,7 +207,8 @@ class Vertex(Drawable):
         #Don't assert isinstance, as that would require importing halfedge
         assert(hasattr(he,'index'))
         self.halfEdges.add(he)
-        logging.debug("Registered v{} to e{}".format(self.index, he.index))
+        if trace.ENABLED:
+            trace.event("vertex.registerHalfEdge", vertex=self.index, edge=he.index)
 
     def unregisterHalfEdge(self, he):
         """ Remove a halfedge from the list that uses this vertex,
@@ -193,7 +217,9 @@ class Vertex(Drawable):
         assert(hasattr(he,'index'))
         if he in self.halfEdges:
             self.halfEdges.remove(he)
-        logging.debug("Remaining edges: {}".format(len(self.halfEdges)))
+        if trace.ENABLED:
+            trace.event("vertex.unregisterHalfEdge", vertex=self.index, edge=he.index,
+                        remaining=len(self.halfEdges))
 
     def get_sorted_edges(self):
         """ return all half-edges that this vertex starts,
@@ -2,6 +2,8 @@ from .dcel import DCEL
 from .Face import Face
 from .HalfEdge import HalfEdge
 from .Vertex import Vertex
+from .arrays import DCELArrays
+from .vertex_index import GridIndex, QuadTreeIndex
 from .constants import FaceE, EdgeE, VertE, EditE
 from . import dcel_drawing as drawing
 
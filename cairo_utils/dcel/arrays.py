@@ -0,0 +1,414 @@
+""" A Struct of Arrays representation of a dcel, for vectorised bulk operations """
+from os import makedirs
+from os.path import isdir, isfile, join
+import logging as root_logger
+import numpy as np
+import pickle
+
+from .. import math as cumath
+from ..constants import TOLERANCE
+from .constants import EdgeE, FaceE, VertE
+from .Face import Face
+from .HalfEdge import HalfEdge
+from .Vertex import Vertex
+
+logging = root_logger.getLogger(__name__)
+
+#Index used in topology arrays for a missing link
+NULL_INDEX = -1
+INDEX_TYPE = np.int32
+#The array attributes saved as separate .npy files:
+COLUMNS = ["coords", "origin", "twin", "next", "prev", "face", "face_offsets", "face_edges",
+           "sites", "vertex_ids", "edge_ids", "face_ids", "active"]
+#The file of data dicts, kept apart from the columns:
+DATA_FILE = "data.pkl"
+
+class DCELArrays:
+    """ Flat numpy arrays of a dcel's geometry and topology.
+    Vertices are rows of an (n, 2) coordinate array, halfedges are
+    rows of the origin/twin/next/prev/face index arrays,
+    and faces are offset ranges into a single array of halfedge indices.
+    Links are row positions, with NULL_INDEX for None.
+    Memory mapped columns, from load, are kept as memmaps, not copied.
+    The *_ids arrays hold the original object indices,
+    and the *_data lists the objects' data dicts, in row order,
+    created on first access.
+    """
+
+    def __init__(self, coords, origin, twin, next, prev, face,
+                 face_offsets, face_edges, sites,
+                 vertex_ids=None, edge_ids=None, face_ids=None,
+                 active=None, vertex_data=None, edge_data=None, face_data=None,
+                 bbox=None):
+        self.coords = np.asanyarray(coords, dtype=float).reshape((-1, 2))
+        self.origin = np.asanyarray(origin, dtype=INDEX_TYPE)
+        self.twin = np.asanyarray(twin, dtype=INDEX_TYPE)
+        self.next = np.asanyarray(next, dtype=INDEX_TYPE)
+        self.prev = np.asanyarray(prev, dtype=INDEX_TYPE)
+        self.face = np.asanyarray(face, dtype=INDEX_TYPE)
+        self.face_offsets = np.asanyarray(face_offsets, dtype=INDEX_TYPE)
+        self.face_edges = np.asanyarray(face_edges, dtype=INDEX_TYPE)
+        self.sites = np.asanyarray(sites, dtype=float).reshape((-1, 2))
+        assert(all([len(x) == len(self.origin) for x in [self.twin, self.next,
+                                                         self.prev, self.face]]))
+        assert(len(self.face_offsets) == len(self.sites) + 1)
+        assert(self.face_offsets[-1] == len(self.face_edges))
+        self.vertex_ids = _default_ids(vertex_ids, len(self.coords))
+        self.edge_ids = _default_ids(edge_ids, len(self.origin))
+        self.face_ids = _default_ids(face_ids, len(self.sites))
+        self.active = np.ones(len(self.coords), dtype=bool)
+        if active is not None:
+            self.active = np.asanyarray(active, dtype=bool)
+        self._vertex_data = _check_data(vertex_data, len(self.coords))
+        self._edge_data = _check_data(edge_data, len(self.origin))
+        self._face_data = _check_data(face_data, len(self.sites))
+        #a saved DATA_FILE to read the data lists from, when first accessed
+        self._data_file = None
+        self.bbox = bbox
+
+    @property
+    def vertex_data(self):
+        if self._vertex_data is None:
+            self.__load_data()
+        return self._vertex_data
+
+    @property
+    def edge_data(self):
+        if self._edge_data is None:
+            self.__load_data()
+        return self._edge_data
+
+    @property
+    def face_data(self):
+        if self._face_data is None:
+            self.__load_data()
+        return self._face_data
+
+    def __repr__(self):
+        return "(DCELArrays: V: {}, HE: {}, F: {})".format(*self.counts())
+
+    def counts(self):
+        return (len(self.coords), len(self.origin), len(self.sites))
+
+    #------------------------------
+    # def conversion
+    #------------------------------
+
+    @staticmethod
+    def from_dcel(dcel):
+        """ Flatten a dcel's objects into arrays, ordered by object index """
+        vertices = sorted(dcel.vertices, key=lambda x: x.index)
+        edges = sorted(dcel.halfEdges, key=lambda x: x.index)
+        faces = sorted(dcel.faces, key=lambda x: x.index)
+        vertex_rows = {x: i for i, x in enumerate(vertices)}
+        edge_rows = {x: i for i, x in enumerate(edges)}
+        face_rows = {x: i for i, x in enumerate(faces)}
+
+        coords = np.array([x.loc for x in vertices], dtype=float).reshape((-1, 2))
+        links = np.array([(vertex_rows.get(e.origin, NULL_INDEX),
+                           edge_rows.get(e.twin, NULL_INDEX),
+                           edge_rows.get(e.next, NULL_INDEX),
+                           edge_rows.get(e.prev, NULL_INDEX),
+                           face_rows.get(e.face, NULL_INDEX)) for e in edges],
+                         dtype=INDEX_TYPE).reshape((-1, 5))
+        face_edges = [[edge_rows[x] for x in f.edgeList if x in edge_rows] for f in faces]
+        face_offsets = np.zeros(len(faces) + 1, dtype=INDEX_TYPE)
+        np.cumsum([len(x) for x in face_edges], out=face_offsets[1:])
+        sites = np.array([f.site if f.site is not None else (np.nan, np.nan) for f in faces],
+                         dtype=float).reshape((-1, 2))
+
+        return DCELArrays(coords, *links.T,
+                          face_offsets,
+                          [x for edge_list in face_edges for x in edge_list],
+                          sites,
+                          vertex_ids=[x.index for x in vertices],
+                          edge_ids=[x.index for x in edges],
+                          face_ids=[x.index for x in faces],
+                          active=[x.active for x in vertices],
+                          vertex_data=[x.data.copy() for x in vertices],
+                          edge_data=[x.data.copy() for x in edges],
+                          face_data=[x.data.copy() for x in faces],
+                          bbox=dcel.bbox)
+
+    def to_dcel(self, dcel=None):
+        """ Rebuild dcel objects from the arrays, into a new or given dcel """
+        if dcel is None:
+            #avoid the circular import of dcel.py
+            from .dcel import DCEL
+            bbox = self.bbox
+            if bbox is None:
+                bbox = self.bounds()
+            dcel = DCEL(bbox=bbox)
+        #read each column once, as memory mapped columns are read on access
+        coords = np.array(self.coords)
+        sites = np.array(self.sites)
+        vertices = [Vertex(loc, index=i, data=data or None, dcel=dcel, active=active)
+                    for loc, i, data, active in zip(coords, self.vertex_ids.tolist(),
+                                                    self.vertex_data, self.active.tolist())]
+        edges = [HalfEdge(index=i, data=data or None, dcel=dcel)
+                 for i, data in zip(self.edge_ids.tolist(), self.edge_data)]
+        faces = [Face(site=None if np.isnan(site).any() else site, index=i, data=data or None,
+                      dcel=dcel)
+                 for site, i, data in zip(sites, self.face_ids.tolist(), self.face_data)]
+
+        def lookup(objs, rows):
+            return [objs[x] if x != NULL_INDEX else None for x in rows.tolist()]
+
+        for edge, origin, twin, next, prev, face in zip(edges,
+                                                       lookup(vertices, self.origin),
+                                                       lookup(edges, self.twin),
+                                                       lookup(edges, self.next),
+                                                       lookup(edges, self.prev),
+                                                       lookup(faces, self.face)):
+            edge.origin = origin
+            edge.twin = twin
+            edge.next = next
+            edge.prev = prev
+            edge.face = face
+            if origin is not None:
+                origin.halfEdges.add(edge)
+        offsets = self.face_offsets.tolist()
+        face_edges = lookup(edges, self.face_edges)
+        for face, start, end in zip(faces, offsets, offsets[1:]):
+            if start != end:
+                face.edgeList = face_edges[start:end]
+        return dcel
+
+    def to_export_data(self):
+        """ Convert to the format of DCEL.export_data, so import_data can rebuild it """
+        edge_ids = self.edge_ids.tolist()
+        vertex_ids = self.vertex_ids.tolist()
+        face_ids = self.face_ids.tolist()
+
+        def lookup(ids, rows):
+            return [ids[x] if x != NULL_INDEX else None for x in rows.tolist()]
+
+        vertex_edges = [[] for x in vertex_ids]
+        for edge_id, vertex in zip(edge_ids, self.origin.tolist()):
+            if vertex != NULL_INDEX:
+                vertex_edges[vertex].append(edge_id)
+
+        vertices = [_export_dict(i, data, VertE, x=loc[0], y=loc[1],
+                                 halfEdges=edges, active=bool(active))
+                    for i, loc, edges, active, data in zip(vertex_ids, self.coords,
+                                                           vertex_edges, self.active,
+                                                           self.vertex_data)]
+        halfEdges = [_export_dict(i, data, EdgeE, origin=o, twin=t, next=n, prev=p, face=f)
+                     for i, o, t, n, p, f, data in zip(edge_ids,
+                                                       lookup(vertex_ids, self.origin),
+                                                       lookup(edge_ids, self.twin),
+                                                       lookup(edge_ids, self.next),
+                                                       lookup(edge_ids, self.prev),
+                                                       lookup(face_ids, self.face),
+                                                       self.edge_data)]
+        faces = [_export_dict(i, data, FaceE, sitex=site[0], sitey=site[1],
+                              edges=[edge_ids[x] for x in self.face_edge_rows(row).tolist()])
+                 for row, (i, site, data) in enumerate(zip(face_ids, self.sites, self.face_data))]
+        bbox = self.bbox
+        if bbox is None:
+            bbox = self.bounds()
+        return {
+            'vertices' : vertices,
+            'halfEdges' : halfEdges,
+            'faces' : faces,
+            'bbox' : bbox
+        }
+
+    #------------------------------
+    # def files
+    #------------------------------
+
+    def save(self, path):
+        """ Save to a directory of one .npy file per column, and a separate DATA_FILE
+        of the non-empty data dicts """
+        if not isdir(path):
+            makedirs(path)
+        for name in COLUMNS:
+            np.save(join(path, "{}.npy".format(name)), getattr(self, name))
+        data = {
+            'vertex' : _sparse_data(self.vertex_data, VertE),
+            'edge' : _sparse_data(self.edge_data, EdgeE),
+            'face' : _sparse_data(self.face_data, FaceE),
+            'bbox' : self.bbox
+        }
+        with open(join(path, DATA_FILE), 'wb') as f:
+            pickle.dump(data, f)
+
+    @staticmethod
+    def load(path, mmap_mode='r'):
+        """ Load a saved directory. Columns are memory mapped by default,
+        so are read from disk as they are used, and data dicts are read on first access.
+        Use mmap_mode='c' to modify columns in place, eg: with transform """
+        if not isfile(join(path, DATA_FILE)):
+            raise Exception("Non-existing DCELArrays directory to load: {}".format(path))
+        columns = {x: np.load(join(path, "{}.npy".format(x)), mmap_mode=mmap_mode)
+                   for x in COLUMNS}
+        #bbox is stored with the data, but needed up front
+        with open(join(path, DATA_FILE), 'rb') as f:
+            bbox = pickle.load(f)['bbox']
+        arrays = DCELArrays(columns['coords'], columns['origin'], columns['twin'],
+                            columns['next'], columns['prev'], columns['face'],
+                            columns['face_offsets'], columns['face_edges'], columns['sites'],
+                            vertex_ids=columns['vertex_ids'], edge_ids=columns['edge_ids'],
+                            face_ids=columns['face_ids'], active=columns['active'],
+                            bbox=bbox)
+        arrays._data_file = join(path, DATA_FILE)
+        return arrays
+
+    #------------------------------
+    # def topology access
+    #------------------------------
+
+    def face_edge_rows(self, row):
+        """ The halfedge rows of a face, in order """
+        return self.face_edges[self.face_offsets[row]:self.face_offsets[row+1]]
+
+    def face_lengths(self):
+        return np.diff(self.face_offsets)
+
+    def edge_ends(self):
+        """ The vertex row each halfedge ends at,
+        from its twin's origin, or its next's origin if there is no twin """
+        ends = np.full(len(self.origin), NULL_INDEX, dtype=INDEX_TYPE)
+        has_next = self.next != NULL_INDEX
+        ends[has_next] = self.origin[self.next[has_next]]
+        has_twin = self.twin != NULL_INDEX
+        ends[has_twin] = self.origin[self.twin[has_twin]]
+        return ends
+
+    #------------------------------
+    # def geometry
+    #------------------------------
+
+    def bounds(self):
+        """ The [minx, miny, maxx, maxy] of all vertices """
+        if not bool(len(self.coords)):
+            return np.zeros(4)
+        return np.concatenate((self.coords.min(axis=0), self.coords.max(axis=0)))
+
+    def edge_coords(self):
+        """ An (e, 2, 2) array of the start and end of each halfedge,
+        NaN where an end doesn't exist """
+        return np.stack((_rows_or_nan(self.coords, self.origin),
+                         _rows_or_nan(self.coords, self.edge_ends())), axis=1)
+
+    def face_coords(self):
+        """ The origins of each face's halfedges, concatenated,
+        and the number of coordinates of each face """
+        rows = self.origin[self.face_edges]
+        return _rows_or_nan(self.coords, rows), self.face_lengths()
+
+    def face_polygons(self):
+        """ A list of (k, 2) coordinate arrays, one per face, for rendering """
+        coords, lengths = self.face_coords()
+        return np.split(coords, self.face_offsets[1:-1])
+
+    def face_centroids(self):
+        """ The area centroids of all faces, and their signed areas.
+        Faces without edges get their site and zero area """
+        coords, lengths = self.face_coords()
+        centroids = self.sites.copy()
+        areas = np.zeros(len(lengths))
+        non_empty = lengths > 0
+        if non_empty.any():
+            centroids[non_empty], areas[non_empty] = cumath.polygon_centroids(coords,
+                                                                              lengths[non_empty])
+        return centroids, areas
+
+    def transform(self, matrix=None, translate=None, centre=None):
+        """ Apply a (2, 2) linear transform, about a centre, then a translation,
+        to all vertices and sites, in place """
+        if centre is None:
+            centre = np.zeros(2)
+        for arr in [self.coords, self.sites]:
+            if matrix is not None:
+                arr[:] = ((arr - centre) @ np.asarray(matrix).T) + centre
+            if translate is not None:
+                arr += translate
+        return self
+
+    def vertices_within(self, bbox, tolerance=TOLERANCE):
+        """ A boolean mask of the vertices inside a [minx, miny, maxx, maxy] bbox,
+        matching math.within_bbox """
+        assert(isinstance(bbox, np.ndarray))
+        assert(bbox.shape == (4, ))
+        mod_bbox = bbox + np.array([-tolerance, -tolerance, tolerance, tolerance])
+        return ((mod_bbox[:2] < self.coords) & (self.coords < mod_bbox[2:])).all(axis=1)
+
+    def edges_within(self, bbox, tolerance=TOLERANCE):
+        """ A boolean mask of the halfedges with both ends inside a bbox """
+        inside = np.append(self.vertices_within(bbox, tolerance=tolerance), False)
+        #NULL_INDEX picks the appended False
+        return inside[self.origin] & inside[self.edge_ends()]
+
+    def faces_within(self, bbox, tolerance=TOLERANCE):
+        """ A boolean mask of the faces with all vertices inside a bbox.
+        Faces without edges are not within """
+        inside = np.append(self.vertices_within(bbox, tolerance=tolerance), False)
+        edge_inside = inside[self.origin[self.face_edges]].astype(int)
+        lengths = self.face_lengths()
+        counts = np.zeros(len(lengths), dtype=int)
+        non_empty = lengths > 0
+        if non_empty.any():
+            counts[non_empty] = np.add.reduceat(edge_inside, self.face_offsets[:-1][non_empty])
+        return non_empty & (counts == lengths)
+
+    #--------------------
+    # PRIVATE METHODS
+    #--------------------
+
+    def __load_data(self):
+        """ Fill in any missing data lists, from the data file or as empty dicts """
+        sparse = {'vertex' : [], 'edge' : [], 'face' : []}
+        if self._data_file is not None:
+            with open(self._data_file, 'rb') as f:
+                sparse = pickle.load(f)
+        if self._vertex_data is None:
+            self._vertex_data = _dense_data(sparse['vertex'], VertE, len(self.coords))
+        if self._edge_data is None:
+            self._edge_data = _dense_data(sparse['edge'], EdgeE, len(self.origin))
+        if self._face_data is None:
+            self._face_data = _dense_data(sparse['face'], FaceE, len(self.sites))
+
+#--------------------
+# PRIVATE FUNCTIONS
+#--------------------
+def _default_ids(ids, length):
+    if ids is None:
+        return np.arange(length)
+    ids = np.asanyarray(ids, dtype=int)
+    assert(len(ids) == length)
+    return ids
+
+def _check_data(data, length):
+    if data is None:
+        return None
+    assert(len(data) == length)
+    return list(data)
+
+def _sparse_data(data, enum):
+    """ The non-empty data dicts as (row, enumData, nonEnumData) """
+    return [(i, {a.name:b for a,b in x.items() if isinstance(a, enum)},
+             {a:b for a,b in x.items() if not isinstance(a, enum)})
+            for i, x in enumerate(data) if bool(x)]
+
+def _dense_data(sparse, enum, length):
+    data = [{} for x in range(length)]
+    for i, enumData, nonEnumData in sparse:
+        data[i].update({enum[a] : b for a,b in enumData.items()})
+        data[i].update(nonEnumData)
+    return data
+
+def _rows_or_nan(coords, rows):
+    """ Index coordinate rows, with NaN for NULL_INDEX """
+    result = np.full((len(rows), 2), np.nan)
+    valid = rows != NULL_INDEX
+    result[valid] = coords[rows[valid]]
+    return result
+
+def _export_dict(index, data, enum, **kwargs):
+    """ Build an export_data entry, splitting enum keyed data from the rest """
+    kwargs['i'] = int(index)
+    kwargs['enumData'] = {a.name:b for a,b in data.items() if isinstance(a, enum)}
+    kwargs['nonEnumData'] = {a:b for a,b in data.items() if not isinstance(a, enum)}
+    return kwargs
@@ -2,14 +2,13 @@
 from collections import namedtuple
 from math import atan2, degrees
 from numbers import Number
-from os.path import isfile
+from os.path import isfile, isdir
 from random import random
 from itertools import cycle, islice
 import IPython
 import math
 import numpy as np
 import pickle
-import pyqtree
 import sys
 
 from ..math import get_distance
@@ -17,12 +16,19 @@ from .Face import Face
 from .HalfEdge import HalfEdge
 from .Vertex import Vertex
 from .Line import Line
-from .constants import EdgeE, VertE
+from .constants import EdgeE, VertE, FaceE
+from .arrays import DCELArrays
 from .line_intersector import LineIntersector
+from .vertex_index import GridIndex
+from ..constants import D_EPSILON
+from .. import trace
 import logging as root_logger
 logging = root_logger.getLogger(__name__)
 
 
+#Locations in one cell of this size are close enough for newVertex to merge:
+BATCH_CELL_SIZE = 2 * D_EPSILON
+
 #for importing data into the dcel:
 DataPair = namedtuple('DataPair', 'key obj data')
 
@@ -35,7 +41,7 @@ class DCEL(object):
     Face = Face
     
     
-    def __init__(self, bbox=None):
+    def __init__(self, bbox=None, index_type=GridIndex):
         if bbox is None:
             bbox = np.array([-200, -200, 200, 200])
         assert(isinstance(bbox, np.ndarray))
@@ -44,8 +50,9 @@ class DCEL(object):
         self.faces = set([])
         self.halfEdges = set([])
         self.bbox = bbox
-        #todo: make this a stack of quadtrees
-        self.vertex_quad_tree = pyqtree.Index(bbox=self.bbox)
+        #The spatial index class for vertices, see vertex_index.py:
+        self.index_type = index_type
+        self.vertex_quad_tree = self.index_type(bbox=self.bbox)
         self.quad_tree_stack = []
         self.frontier = set([])
         self.should_merge_stacks = True
@@ -55,8 +62,18 @@ class DCEL(object):
     def reset_frontier(self):
         self.frontier = set([])
 
+    def clear(self):
+        """ Remove all vertices, edges and faces, keeping the bbox and data,
+        so the dcel can be reused instead of creating a new one """
+        self.vertices.clear()
+        self.faces.clear()
+        self.halfEdges.clear()
+        self.vertex_quad_tree = self.index_type(bbox=self.bbox)
+        self.quad_tree_stack = []
+        self.frontier.clear()
+
     def copy(self):
-        newDCEL = DCEL(self.bbox)
+        newDCEL = DCEL(self.bbox, index_type=self.index_type)
         newDCEL.import_data(self.export_data())        
         return newDCEL
 
@@ -219,7 +236,9 @@ class DCEL(object):
         
     @staticmethod
     def loadfile(filename):
-        """ Create a DCEL from a saved pickle """
+        """ Create a DCEL from a saved pickle, or saved columns """
+        if isdir("{}.dcel".format(filename)):
+            return DCELArrays.load("{}.dcel".format(filename)).to_dcel()
         if not isfile("{}.dcel".format(filename)):
             raise Exception("Non-existing filename to load into dcel")
         with open("{}.dcel".format(filename), 'rb') as f:
@@ -228,12 +247,39 @@ class DCEL(object):
         the_dcel.import_data(dcel_data)
         return the_dcel
 
-    def savefile(self, filename):
-        """ Save dcel data to a pickle """
+    def savefile(self, filename, columnar=False):
+        """ Save dcel data to a pickle, or to a directory of columns,
+        which DCELArrays.load can memory map without creating objects """
+        if columnar:
+            self.to_arrays().save("{}.dcel".format(filename))
+            return
         theData = self.export_data()
         with open("{}.dcel".format(filename), 'wb') as f:
             pickle.dump(theData, f)
 
+    def to_arrays(self):
+        """ Flatten the dcel into a struct of numpy arrays, for vectorised bulk operations """
+        return DCELArrays.from_dcel(self)
+
+    @staticmethod
+    def from_arrays(arrays):
+        """ Create a DCEL from a DCELArrays """
+        assert(isinstance(arrays, DCELArrays))
+        return arrays.to_dcel()
+
+    def update_from_arrays(self, arrays):
+        """ Copy vertex locations and sites from a DCELArrays of this dcel back to the objects,
+        matching them by index, eg: after a transform """
+        assert(isinstance(arrays, DCELArrays))
+        vertex_rows = {x: i for i, x in enumerate(arrays.vertex_ids.tolist())}
+        face_rows = {x: i for i, x in enumerate(arrays.face_ids.tolist())}
+        for vert in self.vertices:
+            if vert.index in vertex_rows:
+                vert.loc = arrays.coords[vertex_rows[vert.index]].copy()
+        for face in self.faces:
+            if face.site is not None and face.index in face_rows:
+                face.site = arrays.sites[face_rows[face.index]].copy()
+
         
 
     #------------------------------
@@ -241,11 +287,11 @@ class DCEL(object):
     #------------------------------
     
     def clear_quad_tree(self):
-        self.vertex_quad_tree = pyqtree.Index(bbox=self.bbox)
+        self.vertex_quad_tree = self.index_type(bbox=self.bbox)
 
     def calculate_quad_tree(self, subverts=None):
         """ Recalculate the quad tree with all vertices, or a subselection of vertices """
-        self.vertex_quad_tree = pyqtree.Index(bbox=self.bbox)
+        self.vertex_quad_tree = self.index_type(bbox=self.bbox)
         verts = self.vertices
         if subverts is not None:
             assert(all([isinstance(x, Vertex) for x in subverts]))
@@ -255,14 +301,14 @@ class DCEL(object):
         
     def push_quad_tree(self):
         self.quad_tree_stack.append(self.vertex_quad_tree)
-        self.vertex_quad_tree = pyqtree.Index(bbox=self.bbox)
+        self.vertex_quad_tree = self.index_type(bbox=self.bbox)
 
     def pop_quad_tree(self):
         assert(len(self.quad_tree_stack) > 0)
         sub_layer = self.quad_tree_stack.pop()
         if self.should_merge_stacks:
-            for x in self.vertex_quad_tree.intersect(self.bbox):
-                if x not in sub_layer.intersect(x.bbox()):                
+            for x in self.vertex_quad_tree:
+                if x not in sub_layer:
                     sub_layer.insert(item=x, bbox=x.bbox())
         self.vertex_quad_tree = sub_layer
 
@@ -272,7 +318,17 @@ class DCEL(object):
         assert(len(self.quad_tree_stack) > 0)
         for x in verts:
             self.vertex_quad_tree.insert(item=x, bbox=x.bbox())
-        
+
+    def reindex_vertex(self, vert):
+        """ Update a moved vertex's entry in each quad tree it is in """
+        for quad_tree in self.quad_tree_stack + [self.vertex_quad_tree]:
+            if vert in quad_tree:
+                quad_tree.move(vert, vert.bbox())
+
+    def unindex_vertex(self, vert):
+        """ Remove a vertex from every quad tree """
+        for quad_tree in self.quad_tree_stack + [self.vertex_quad_tree]:
+            quad_tree.remove(vert)
         
     def __enter__(self):
         """ Makes the Dcel a reusable context manager, that pushes
@@ -334,6 +390,7 @@ class DCEL(object):
             target_update.add(edge)
             
         self.vertices.remove(target)
+        self.unindex_vertex(target)
         
         return target_update
 
@@ -376,8 +433,6 @@ class DCEL(object):
                 targets = targets.union(self.purge_face(current))
             purged.add(current)
 
-        self.calculate_quad_tree()
-
     #------------------------------
     # def Vertex, Edge, HalfEdge Creation
     #------------------------------
@@ -389,22 +444,40 @@ class DCEL(object):
         assert(isinstance(loc, np.ndarray))
         newVert = None
         matchingVertices = self.vertex_quad_tree.intersect(Vertex.free_bbox(loc))
-        logging.debug("Quad Tree Size: {}".format(self.vertex_quad_tree.countmembers()))
-        logging.debug("Query result: {}".format(matchingVertices))
-        if bool(matchingVertices) and not force:
+        reused = bool(matchingVertices) and not force
+        if reused:
             #a good enough vertex exists
             newVert = matchingVertices.pop()
             if data is not None:
                 newVert.data.update(data)
-            logging.debug("Found a matching vertex: {}".format(newVert))
         else:
             #no matching vertex,  add this new one
             newVert = Vertex(loc, data=data, dcel=self)
-            logging.debug("No matching vertex,  storing: {}, {}".format(newVert, newVert.bbox()))
 
         assert(newVert is not None)
+        if trace.ENABLED:
+            trace.event("dcel.newVertex", index=newVert.index, loc=loc, reused=reused,
+                        matches=len(matchingVertices))
         return newVert
 
+    def newVertices(self, locs, data=None):
+        """ Create or reuse a vertex for each row of an (n, 2) array.
+        Locations sharing a BATCH_CELL_SIZE cell are merged in one vectorised pass,
+        then the first location of each group is matched like newVertex """
+        assert(isinstance(locs, np.ndarray))
+        locs = locs.reshape((-1, 2)).astype(np.float64)
+        if not bool(len(locs)):
+            return []
+        cells = np.floor(locs / BATCH_CELL_SIZE)
+        unique_cells, firsts, inverse = np.unique(cells, axis=0, return_index=True,
+                                                  return_inverse=True)
+        #create groups in the order of their first location
+        order = np.argsort(firsts)
+        group_verts = np.empty(len(firsts), dtype=object)
+        for group in order:
+            group_verts[group] = self.newVertex(locs[firsts[group]], data=data)
+        return group_verts[inverse.reshape(-1)].tolist()
+
     def newEdge(self, originVertex, twinVertex, face=None, twinFace=None,
                 prev=None, twinPrev=None, next=None, twinNext=None,
                 edata=None, vdata=None):
@@ -441,11 +514,11 @@ class DCEL(object):
             e1.data.update(edata)
             e2.data.update(edata)
         if vdata is not None:
-            e1.origin.data.update(vdata)
-            e2.origin.data.update(vdata)            
+            for v in [x.origin for x in [e1, e2] if x.origin is not None]:
+                v.data.update(vdata)
         self.halfEdges.update([e1, e2])
-        logging.debug("Created Edge Pair: {}".format(e1.index))
-        logging.debug("Created Edge Pair: {}".format(e2.index))
+        if trace.ENABLED:
+            trace.event("dcel.newEdge", index=e1.index, twin=e2.index)
         return e1
 
     def newFace(self, site=None, edges=None, verts=None, coords=None, data=None):
@@ -602,14 +675,14 @@ class DCEL(object):
         assert(isinstance(radius, float))
         assert(centre.shape == (2,))
 
-        #constrain faces
-        faces = self.faces.copy()
+        #constrain faces, in index order to not depend on object hashes
+        faces = sorted(self.faces, key=lambda x: x.index)
         for f in faces:
             logging.debug("Constraining Face: {}".format(f))
             f.constrain_to_circle(centre, radius, candidates=candidates, force=force)
         
         #constrain free edges
-        hedges = self.halfEdges.copy()
+        hedges = sorted(self.halfEdges, key=lambda x: x.index)
         for he in hedges:
             logging.debug("Constraining Hedge: {}".format(he))
             if he.face is not None or he.markedForCleanup:
@@ -630,13 +703,14 @@ class DCEL(object):
         assert(isinstance(bbox, np.ndarray))
         assert(bbox.shape == (4,))
 
-        faces = self.faces.copy()
+        #in index order, to not depend on object hashes
+        faces = sorted(self.faces, key=lambda x: x.index)
         for f in faces:
             logging.debug("Constraining Face: {}".format(f))
             f.constrain_to_bbox(bbox, candidates=candidates, force=force)
         
         #constrain free edges
-        hedges = self.halfEdges.copy()
+        hedges = sorted(self.halfEdges, key=lambda x: x.index)
         for he in hedges:
             logging.debug("Constraining Hedge: {}".format(he))
             if he.face is not None or he.markedForCleanup:
@@ -9,6 +9,7 @@ from math import inf
 from ..heaputils import pop_while_same, HeapWrapper
 from ..rbtree import RBTree, Directions
 from ..constants import D_EPSILON
+from .. import trace
 from .constants import SWEEP_NUDGE
 from .Vertex import Vertex
 from .HalfEdge import HalfEdge
@@ -148,7 +149,9 @@ class LineIntersector:
             
             #insert the segments with the status line a little lower
             candidate_lines = contain_set.union(upper_set)
-            newNodes = self.insert_values(candidate_lines, curr_x=curr_vert.loc[0])
+            #new segments land beside the closest node, if it wasn't deleted
+            hint = closest_node if closest_node in self.status_tree.nodes else None
+            newNodes = self.insert_values(candidate_lines, curr_x=curr_vert.loc[0], hint=hint)
 
             #Calculate additional events
             self.debug_chain("Inserted")
@@ -232,11 +235,11 @@ class LineIntersector:
             assert(bool(self.status_tree))
             if not bool(newNodes):
                 return
-            #TODO: this could be more efficient
-            chain = self.status_tree.get_chain()
-            ordered = [x for x in chain if x in newNodes]
-            logging.debug("New Nodes: {}".format([x.value.index for x in ordered]))
-            leftmost = ordered[0]
+            #scan in from each end of the status tree for the outermost new nodes
+            newNodes = set(newNodes)
+            if trace.ENABLED:
+                trace.event("intersector.new_nodes", edges=sorted(x.value.index for x in newNodes))
+            leftmost = next(x for x in self.status_tree if x in newNodes)
             leftmostN = leftmost.getPredecessor()
             if leftmostN is not None and leftmost is not None:
                 self.findNewEvents(leftmostN.value,
@@ -244,7 +247,9 @@ class LineIntersector:
                                    curr_vert.toArray())
 
                 
-            rightmost = ordered[-1]
+            rightmost = next(x for x in self.status_tree.iter_from(self.status_tree.max(),
+                                                                   reverse=True)
+                             if x in newNodes)
             rightmostN = rightmost.getSuccessor()
                 
             if rightmost is not None and rightmostN is not None:
@@ -332,7 +337,7 @@ class LineIntersector:
         except AssertionError as e:
             IPython.embed(simple_prompt=True)
 
-    def insert_values(self, candidates, curr_x):
+    def insert_values(self, candidates, curr_x, hint=None):
         logging.debug("Inserting values: {}".format([x.index for x in candidates]))
 
         flat_lines = set([x for x in candidates if x.isFlat()])
@@ -341,10 +346,14 @@ class LineIntersector:
         assert(all([x.isUpper() for x in toAdd]))
         newNodes = self.status_tree.insert(*toAdd,
                                            cmpData={'y':self.sweep_y, 'nudge': SWEEP_NUDGE,
-                                                    'x': curr_x + D_EPSILON})
+                                                    'x': curr_x + D_EPSILON},
+                                           hint=hint)
+        if bool(newNodes):
+            hint = newNodes[-1]
         newNodes += self.status_tree.insert(*flat_lines,
                                             cmpData={'y':self.sweep_y, 'nudge':SWEEP_NUDGE,
-                                                     'x': curr_x + D_EPSILON})
+                                                     'x': curr_x + D_EPSILON},
+                                            hint=hint)
 
         return newNodes
         
@@ -0,0 +1,178 @@
+""" Spatial Indices of Vertices that can be updated incrementally.
+Each provides insert, move, remove, intersect, rebuild, countmembers,
+len, iteration, and membership, so a DCEL can use either """
+import logging as root_logger
+import pyqtree
+
+from ..constants import D_EPSILON
+
+logging = root_logger.getLogger(__name__)
+
+#Vertex queries span 4 * D_EPSILON with expansion, so cover 2x2 cells of this size:
+GRID_CELL_SIZE = 4 * D_EPSILON
+
+class QuadTreeIndex:
+    """ A pyqtree.Index that also tracks its items, for membership and moves.
+    pyqtree removes an entry only given the exact bbox it was inserted with,
+    so the current bbox of each item is kept to remove or move it by.
+    """
+
+    def __init__(self, bbox, max_items=10, max_depth=20):
+        assert(bbox is not None)
+        self.bbox = bbox
+        self.max_items = max_items
+        self.max_depth = max_depth
+        #item -> its current bbox
+        self._bboxes = {}
+        self._tree = pyqtree.Index(bbox=bbox, max_items=max_items, max_depth=max_depth)
+
+    def __len__(self):
+        return len(self._bboxes)
+
+    def __contains__(self, item):
+        return item in self._bboxes
+
+    def __iter__(self):
+        return iter(list(self._bboxes))
+
+    def countmembers(self):
+        return len(self._bboxes)
+
+    def insert(self, item, bbox):
+        """ Add an item, or move it if it is already in the index """
+        rect = _normalize_rect(bbox)
+        if item in self._bboxes:
+            if self._bboxes[item] == rect:
+                return
+            self._tree.remove(item, self._bboxes[item])
+        self._bboxes[item] = rect
+        self._tree.insert(item, rect)
+
+    def move(self, item, bbox):
+        """ Update the bbox of an item already in the index """
+        assert(item in self._bboxes)
+        self.insert(item, bbox)
+
+    def remove(self, item):
+        """ Remove an item, returning whether it was in the index """
+        if item not in self._bboxes:
+            return False
+        self._tree.remove(item, self._bboxes.pop(item))
+        return True
+
+    def intersect(self, bbox):
+        """ Get the set of items whose bbox intersects the given bbox """
+        return set(self._tree.intersect(bbox))
+
+    def rebuild(self):
+        """ Recreate the quadtree, as pyqtree doesn't merge emptied nodes """
+        self._tree = pyqtree.Index(bbox=self.bbox, max_items=self.max_items,
+                                   max_depth=self.max_depth)
+        for item, rect in self._bboxes.items():
+            self._tree.insert(item, rect)
+
+class GridIndex:
+    """ A uniform hash grid of items, keyed by the cell of their bbox centre.
+    Queries are expanded by the largest item bbox inserted, so point-like
+    vertices are found by looking in a few cells, in constant time.
+    Queries covering more cells than there are items scan all items instead.
+    """
+
+    def __init__(self, bbox=None, cell_size=GRID_CELL_SIZE):
+        assert(cell_size > 0)
+        self.bbox = bbox
+        self.cell_size = cell_size
+        #cell -> {item : None}
+        self._cells = {}
+        #item -> (bbox, cell)
+        self._entries = {}
+        #largest half width or height of an item bbox
+        self._extent = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return item in self._entries
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def countmembers(self):
+        return len(self._entries)
+
+    def insert(self, item, bbox):
+        """ Add an item, or move it if it is already in the index """
+        rect = _normalize_rect(bbox)
+        cell = self.cell((rect[0] + rect[2]) * 0.5, (rect[1] + rect[3]) * 0.5)
+        if item in self._entries:
+            self.__remove_from_cell(item)
+        self._entries[item] = (rect, cell)
+        self._cells.setdefault(cell, {})[item] = None
+        self._extent = max(self._extent, (rect[2] - rect[0]) * 0.5, (rect[3] - rect[1]) * 0.5)
+
+    def move(self, item, bbox):
+        """ Update the bbox of an item already in the index """
+        assert(item in self._entries)
+        self.insert(item, bbox)
+
+    def remove(self, item):
+        """ Remove an item, returning whether it was in the index """
+        if item not in self._entries:
+            return False
+        self.__remove_from_cell(item)
+        del self._entries[item]
+        return True
+
+    def intersect(self, bbox):
+        """ Get the set of items whose bbox intersects the given bbox """
+        rect = _normalize_rect(bbox)
+        i0, j0 = self.cell(rect[0] - self._extent, rect[1] - self._extent)
+        i1, j1 = self.cell(rect[2] + self._extent, rect[3] + self._extent)
+        entries = self._entries
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(entries):
+            candidates = entries
+        else:
+            candidates = []
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    contents = self._cells.get((i, j))
+                    if contents is not None:
+                        candidates.extend(contents)
+        return {x for x in candidates if _rects_intersect(entries[x][0], rect)}
+
+    def rebuild(self):
+        """ Recalculate the query expansion from the current items """
+        self._extent = 0
+        for rect, cell in self._entries.values():
+            self._extent = max(self._extent, (rect[2] - rect[0]) * 0.5, (rect[3] - rect[1]) * 0.5)
+
+    def cell(self, x, y):
+        """ The grid cell of a point """
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    #--------------------
+    # PRIVATE METHODS
+    #--------------------
+
+    def __remove_from_cell(self, item):
+        cell = self._entries[item][1]
+        contents = self._cells[cell]
+        del contents[item]
+        if not bool(contents):
+            del self._cells[cell]
+
+#--------------------
+# PRIVATE FUNCTIONS
+#--------------------
+def _normalize_rect(bbox):
+    x1, y1, x2, y2 = [float(x) for x in bbox]
+    if x2 < x1:
+        x1, x2 = x2, x1
+    if y2 < y1:
+        y1, y2 = y2, y1
+    return (x1, y1, x2, y2)
+
+def _rects_intersect(a, b):
+    """ The same test as pyqtree's intersect, including touching bboxes """
+    return a[2] >= b[0] and a[0] <= b[2] and a[3] >= b[1] and a[1] <= b[3]
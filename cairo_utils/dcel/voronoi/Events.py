@@ -2,10 +2,15 @@
     in the voronoi calculation
 """
 import IPython
+import heapq
 import numpy as np
 from enum import Enum
 
 CIRCLE_EVENTS = Enum("Circle Event Sides", "LEFT RIGHT")
+#Compact the event queue once cancelled events are this proportion of it
+COMPACT_RATIO = 0.5
+#and there are at least this many of them
+COMPACT_MIN = 64
 
 class VEvent:
     offset = 0
@@ -15,12 +20,17 @@ class VEvent:
         assert(isinstance(site_location, np.ndarray))
         self.loc = site_location #tuple
         self.step = i
+        self.active = True
+        #Whether the event is currently stored in an EventQueue
+        self.queued = False
+        #The order the event was queued in, to pop events at the same y first in first out
+        self.order = 0
 
     def y(self):
         return self.loc[1]
 
     def __lt__(self,other):
-        return (VEvent.offset - self.y()) < (VEvent.offset - other.y())
+        return (VEvent.offset - self.y(), self.order) < (VEvent.offset - other.y(), other.order)
     
 class SiteEvent(VEvent):
     """ Subclass for representing individual points / cell centres """
@@ -59,8 +69,99 @@ class CircleEvent(VEvent):
                                                                                 self.step)
             
     def deactivate(self):
-        """ Deactivating saves on having to reheapify """
+        """ Deactivating saves on having to reheapify,
+        use EventQueue.cancel to also count it for compaction """
         self.active = False
 
+class EventQueue:
+    """ A Min Heap of events, where cancelled events are counted,
+    skipped when popped, and removed in bulk once enough have built up.
+    Events at the same y pop in the order they were queued
+    """
+
+    def __init__(self, compact_ratio=COMPACT_RATIO, compact_min=COMPACT_MIN):
+        self.heap = []
+        self.cancelled = 0
+        #The order given to the next event queued
+        self.next_order = 0
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+
+    def __len__(self):
+        """ The number of active events """
+        return len(self.heap) - self.cancelled
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        """ Iterate the active events, in heap order rather than sorted """
+        return (x for x in self.heap if x.active)
+
+    def push(self, event):
+        assert(isinstance(event, VEvent))
+        assert(not event.queued)
+        self.__enqueue(event)
+        heapq.heappush(self.heap, event)
+
+    def extend(self, events):
+        """ Push multiple events in order, heapifying once instead of per event """
+        assert(all([isinstance(x, VEvent) and not x.queued for x in events]))
+        for event in events:
+            self.__enqueue(event)
+        self.heap.extend(events)
+        heapq.heapify(self.heap)
+
+    def restore(self, events):
+        """ Replace the queue with events in the order they are to pop """
+        self.clear()
+        self.extend(events)
+        self.cancelled = len([x for x in self.heap if not x.active])
+
+    def pop(self):
+        """ Pop the next active event, discarding any cancelled events before it """
+        while bool(self.heap):
+            event = heapq.heappop(self.heap)
+            event.queued = False
+            if event.active:
+                return event
+            self.cancelled -= 1
+        return None
+
+    def cancel(self, event):
+        """ Deactivate an event, compacting the queue if enough are cancelled """
+        if not event.active:
+            return
+        event.deactivate()
+        if not event.queued:
+            return
+        self.cancelled += 1
+        if self.cancelled >= self.compact_min and \
+           self.cancelled > self.compact_ratio * len(self.heap):
+            self.compact()
+
+    def clear(self):
+        """ Empty the queue, keeping it for reuse """
+        for event in self.heap:
+            event.queued = False
+        self.heap.clear()
+        self.cancelled = 0
+        self.next_order = 0
+
+    def compact(self):
+        """ Remove all cancelled events and reheapify """
+        for event in self.heap:
+            if not event.active:
+                event.queued = False
+        self.heap = [x for x in self.heap if x.active]
+        heapq.heapify(self.heap)
+        self.cancelled = 0
 
+    #--------------------
+    # PRIVATE METHODS
+    #--------------------
 
+    def __enqueue(self, event):
+        event.queued = True
+        event.order = self.next_order
+        self.next_order += 1
@@ -1 +1,2 @@
 from .voronoi import Voronoi
+from .tiled import tiled_voronoi, stitch_tiles
@@ -0,0 +1,139 @@
+""" tiled.py : Construct a Voronoi Diagram as independent tiles in a process pool,
+    stitching the resulting faces into a single DCEL.
+    Each tile is calculated with the sites within a halo margin around it,
+    so the halo needs to be wider than the faces near the tile seams for
+    the stitched diagram to match a single sweep. It defaults to a few mean
+    site spacings, as the size of faces depends on the density of sites.
+"""
+import numpy as np
+import logging as root_logger
+from multiprocessing import Pool
+
+from cairo_utils.dcel import DCEL
+
+from .voronoi import Voronoi, BBOX, FINALISE_MARGIN, base_voronoi_face_data, base_voronoi_edge_data
+
+logging = root_logger.getLogger(__name__)
+
+#Default number of tiles in x and y
+TILES = (2,2)
+#Default halo margin, in mean site spacings
+HALO_SPACINGS = 3
+
+
+def tiled_voronoi(sites, bbox=BBOX, tiles=TILES, halo=None, processes=None, **kwargs):
+    """ Calculate the voronoi diagram of sites, split into tiles of bbox,
+    each calculated in a separate process, and stitch them into one DCEL.
+    Halo is the margin of surrounding sites each tile uses,
+    defaulting to HALO_SPACINGS mean site spacings.
+    processes=1 calculates the tiles in this process.
+    kwargs are passed to each tile's Voronoi
+    """
+    assert(isinstance(sites, np.ndarray))
+    assert(sites.shape[1] == 2)
+    assert(isinstance(bbox, np.ndarray))
+    assert(bbox.shape == (4,))
+    assert(len(tiles) == 2)
+    tile_size = (bbox[2:] - bbox[:2]) / np.array(tiles)
+    if halo is None:
+        halo = HALO_SPACINGS * _mean_spacing(len(sites), bbox)
+    #the region the whole diagram would be constrained to
+    bounds = bbox + FINALISE_MARGIN
+
+    tile_indices = _tile_indices(sites, bbox, tiles)
+    tasks = []
+    for tx in range(tiles[0]):
+        for ty in range(tiles[1]):
+            owned = np.all(tile_indices == np.array([tx, ty]), axis=1)
+            if not owned.any():
+                continue
+            lower = bbox[:2] + tile_size * np.array([tx, ty])
+            region = np.concatenate((lower - halo, lower + tile_size + halo))
+            in_region = np.all((region[:2] <= sites) & (sites <= region[2:]), axis=1)
+            in_region |= owned
+            #constrain to the same bounds as the whole diagram at the edges:
+            region[:2] = np.maximum(region[:2], bounds[:2])
+            region[2:] = np.minimum(region[2:], bounds[2:])
+            tasks.append((sites[in_region], owned[in_region],
+                          region - FINALISE_MARGIN, kwargs))
+
+    logging.info("Calculating {} tiles".format(len(tasks)))
+    if processes == 1:
+        results = [_calculate_tile(x) for x in tasks]
+    else:
+        with Pool(processes) as pool:
+            results = pool.map(_calculate_tile, tasks)
+
+    return stitch_tiles([cell for result in results for cell in result], bbox=bbox)
+
+def stitch_tiles(cells, bbox=BBOX, dcel=None):
+    """ Combine a list of (site, ccw vertex coords) cells into a DCEL,
+    sharing the vertices and edges of neighbouring cells
+    """
+    if dcel is None:
+        dcel = DCEL(bbox=bbox)
+    #(origin, twin origin) -> halfedge, for edges whose twin is not yet in a face
+    open_edges = {}
+    for site, ring in cells:
+        verts = [dcel.newVertex(x) for x in ring]
+        #drop vertices merged together by newVertex
+        verts = [x for i, x in enumerate(verts) if x is not verts[i-1]]
+        if len(verts) < 3:
+            logging.warning("Skipping degenerate tile face: {}".format(site))
+            continue
+        face = dcel.newFace(site, data=base_voronoi_face_data)
+        edges = []
+        for a, b in zip(verts, verts[1:] + verts[:1]):
+            if (b, a) in open_edges:
+                edge = open_edges.pop((b, a)).twin
+            else:
+                edge = dcel.newEdge(a, b, edata=base_voronoi_edge_data)
+                open_edges[(a, b)] = edge
+            face.add_edge(edge)
+            edges.append(edge)
+        dcel.linkEdgesTogether(edges, loop=True)
+    return dcel
+
+
+#--------------------
+# PRIVATE FUNCTIONS
+#--------------------
+def _tile_indices(sites, bbox, tiles):
+    """ Get the (x,y) tile index of each site, sites on the max edge of bbox
+    belong to the last tile """
+    tile_size = (bbox[2:] - bbox[:2]) / np.array(tiles)
+    indices = np.floor((sites - bbox[:2]) / tile_size).astype(int)
+    return np.clip(indices, 0, np.array(tiles) - 1)
+
+def _mean_spacing(num_sites, bbox):
+    """ The mean distance between sites evenly spread over bbox """
+    area = np.prod(bbox[2:] - bbox[:2])
+    return np.sqrt(area / max(1, num_sites))
+
+def _calculate_tile(task):
+    """ Calculate a single tile of a tiled voronoi,
+    returning the ccw coords of the faces of the sites it owns.
+    Module level so it can be sent to a process pool.
+    """
+    sites, owned, vbbox, kwargs = task
+    owned_coords = set([(x[0], x[1]) for x in sites[owned]])
+    voronoi = Voronoi(num_of_nodes=len(sites), bbox=vbbox, **kwargs)
+    voronoi.initGraph(data=sites, rerun=True)
+    voronoi.calculate_to_completion()
+    voronoi.finalise_DCEL()
+
+    cells = []
+    for site in voronoi.sites:
+        if (site.loc[0], site.loc[1]) not in owned_coords \
+           or site.face not in voronoi.dcel.faces:
+            continue
+        #both ends of each edge, as finalised edges are not always linked head to tail:
+        coords = [x.loc for edge in site.face.edgeList for x in edge.getVertices() if x is not None]
+        coords = np.unique(np.array(coords).reshape((-1,2)), axis=0)
+        if len(coords) < 3:
+            continue
+        #faces are convex, so order around their average:
+        offsets = coords - coords.mean(axis=0)
+        coords = coords[np.argsort(np.arctan2(offsets[:,1], offsets[:,0]))]
+        cells.append((site.loc.copy(), coords))
+    return cells
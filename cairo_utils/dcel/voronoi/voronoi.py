@@ -3,24 +3,29 @@
 """
 import numpy as np
 import numpy.random as random
-import heapq
 import pickle
 import logging as root_logger
 import sys
 import IPython
+from os import replace
 from os.path import isfile
 from string import ascii_uppercase
-from math import pi, sin, cos
+from math import pi, sin, cos, inf
+from enum import Enum
 
 import cairo_utils as utils
 from cairo_utils import Parabola
+from cairo_utils.Parabola import BreakpointCache
 from cairo_utils import rbtree
+from cairo_utils import trace
 from cairo_utils.rbtree.ComparisonFunctions import arc_comparison, Directions, arc_equality
 
 from cairo_utils.dcel import DCEL, HalfEdge, Face
-from cairo_utils.math import get_distance_raw, bound_line_in_bbox, isClockwise, bbox_centre
+from cairo_utils.math import get_distance_raw, bound_line_in_bbox, bbox_centre
+from cairo_utils.math import circumcircles, are_clockwise, get_lowest_point_on_circle
+from cairo_utils.math import polygon_centroids
 
-from .Events import SiteEvent, CircleEvent, VEvent, CIRCLE_EVENTS, arc_cleanup
+from .Events import SiteEvent, CircleEvent, VEvent, EventQueue, CIRCLE_EVENTS
 from .voronoi_drawing import Voronoi_Debug
 
 logging = root_logger.getLogger(__name__)
@@ -32,18 +37,42 @@ BBOX = np.array([0,0,1,1]) #the bbox of the final image
 EPSILON = sys.float_info.epsilon
 MAX_STEPS = 100000
 CARTESIAN = True
+#Only update arcs of the beachline when they are needed, instead of every step
+LAZY_ARCS = False
+#Keep every circle event created, for debug drawing
+KEEP_CIRCLES = True
+#Keep a snapshot of the beachline after every step, for step replay
+KEEP_BEACHLINE = False
+#Lloyd relaxation defaults
+RELAX_TOLERANCE = 1e-4
+RELAX_MAX_ITER = 50
+#Steps between checkpoints, when checkpointing a calculation
+CHECKPOINT_STEPS = 10000
+#Circle events further away than this are ignored
+MAX_CIRCLE_RADIUS = 20000
+#Offset applied to the bbox the finalised diagram is constrained to
+FINALISE_MARGIN = np.array([100,100,-100,-100])
 
 base_voronoi_vert_data = { "VORONOI_VERTEX" : True}
 base_voronoi_edge_data = {"VORONOI_EDGE" : True}
 base_voronoi_face_data = {"VORONOI_FAE" : True}
 
+#Beachline node data key of the (neighbour, halfedge) of the breakpoint to its right.
+#Breakpoints are only looked up from their left node, so the left side isn't stored
+BREAKPOINT_EDGES = Enum("Breakpoint Edge Sides", "RIGHT")
+
 class Voronoi:
     """ Creates a random selection of points, and step by step constructs
-        a voronoi diagram
+        a voronoi diagram.
+        Arcs are updated to the sweep line every step by default (lazy_arcs=False).
+        Beachline searches use the breakpoint cache rather than the stored arcs,
+        so lazy_arcs only skips the per step _update_arcs, with the arcs
+        updated when the diagram is drawn or finalised instead.
     """
     def __init__(self, num_of_nodes=10, bbox=BBOX, save_name=SAVENAME,
-                 debug_draw=False, n=10, max_steps=MAX_STEPS, dcel=None):
-        assert(isinstance(sizeTuple, tuple))
+                 debug_draw=False, n=10, max_steps=MAX_STEPS, dcel=None,
+                 lazy_arcs=LAZY_ARCS, keep_circles=KEEP_CIRCLES,
+                 keep_beachline=KEEP_BEACHLINE):
         assert(isinstance(bbox, np.ndarray))
         assert(bbox.shape == (4,))
         self.current_step = 0
@@ -59,21 +88,29 @@ class Voronoi:
             if self.bbox != self.dcel.bbox:
                 self.bbox = self.bbox
         #Min Heap of site/circle events
-        self.events = []
+        self.events = EventQueue()
         #backup of the original sites
         self.sites = []
-        #backup of all circle events
+        #backup of all circle events, if kept
         self.circles = []
-        #storage of breakpoint tuples -> halfedge
-        self.halfEdges = {}
+        self.keep_circles = keep_circles
         #The bbox of the diagram
         self.bbox = bbox
         VEvent.offset = self.bbox[3] - self.bbox[1]
         
         #The Beach Line Data Structure
         self.beachline = None
+        #Snapshots of the beachline values after each step, if kept
+        self.beachline_history = []
+        self.keep_beachline = keep_beachline
         #The sweep line position
         self.sweep_position = None
+        #Breakpoints of the beachline at the current sweep line position
+        self.breakpoints = BreakpointCache()
+        #Whether arcs are updated to the sweep line on demand, or every step
+        self.lazy_arcs = lazy_arcs
+        #Whether the dcel has been completed and constrained
+        self.finalised = False
             
 
         #File name to pickle data to:
@@ -86,24 +123,37 @@ class Voronoi:
     #--------------------
     # PUBLIC METHODS
     #--------------------
-    def reset(self):
-        """ Reset the internal data structures """
-        if not self.__protect_dcel:
-            self.dcel = DCEL(bbox=self.bbox)
-        self.events = []
-        self.circles = []
-        self.halfEdges = {}
+    def reset(self, reuse=False):
+        """ Reset the internal data structures.
+        reuse : clear the existing dcel and containers instead of creating new ones
+        """
+        if reuse:
+            if not self.__protect_dcel:
+                self.dcel.clear()
+            self.events.clear()
+            self.circles.clear()
+            self.sites.clear()
+        else:
+            if not self.__protect_dcel:
+                self.dcel = DCEL(bbox=self.bbox)
+            self.events = EventQueue()
+            self.circles = []
+            self.sites = []
         self.sweep_position = None
+        self.breakpoints = BreakpointCache()
         self.beachline = rbtree.RBTree(cmpFunc=arc_comparison,
-                                       eqFunc=arc_equality)
+                                       eqFunc=arc_equality,
+                                       persistent=self.keep_beachline)
+        self.beachline_history = []
+        self.finalised = False
 
         self.current_step = 0
 
         
-    def initGraph(self,data=None,rerun=False):
+    def initGraph(self,data=None,rerun=False,reuse=False):
         """ Create a graph of initial random sites """
         logging.debug("Initialising graph")
-        self.reset()
+        self.reset(reuse=reuse)
 
         values = data
         if values is None and not rerun:
@@ -113,29 +163,21 @@ class Voronoi:
         #create a (n,2) array of coordinates for the sites, if no data has been loaded
         if values is None:
             logging.debug("Generating values")
-            for n in range(self.nodeSize):
-                rndAmnt = random.random((1,2))
-                #scale the new site
-                scaler = self.bbox.reshape((2,2)).transpose()
-                newSite = scaler[:,0] + (rndAmnt * (scaler[:,1] - scaler[:,0]))
-                if values is None:
-                    values = newSite
-                else:
-                    values = np.row_stack((values,newSite))
+            rndAmnt = random.random((self.nodeSize, 2))
+            #scale the new sites
+            values = self.bbox[:2] + (rndAmnt * (self.bbox[2:] - self.bbox[:2]))
+
+        #Avoid duplications, keeping the first of each in the original order:
+        unique_indices = np.sort(np.unique(values, axis=0, return_index=True)[1])
+        if len(unique_indices) < len(values):
+            logging.warning("Skipping {} Duplicates".format(len(values) - len(unique_indices)))
 
         #setup the initial site events:
-        usedCoords = []
-        for site in values:
-            #Avoid duplications:
-            if (site[0],site[1]) in usedCoords:
-                logging.warn("Skipping Duplicate: {}".format(site))
-                continue
+        for site in values[unique_indices]:
             #Create an empty face for the site
             futureFace = self.dcel.newFace(site, data=base_voronoi_face_data)
-            event = SiteEvent(site,face=futureFace)
-            heapq.heappush(self.events,event)
-            self.sites.append(event)
-            usedCoords.append((site[0],site[1]))
+            self.sites.append(SiteEvent(site,face=futureFace))
+        self.events.extend(self.sites)
 
         #Save the nodes
         if not rerun:
@@ -171,22 +213,71 @@ class Voronoi:
         self.initGraph(data=newSites,rerun=True)
         self.calculate_to_completion()
         
-    def calculate_to_completion(self):
-        """ Calculate the entire voronoi for all points """
+    def relax_until(self, tol=RELAX_TOLERANCE, max_iter=RELAX_MAX_ITER, amnt=1.0):
+        """ Lloyd relaxation. Repeatedly move every site toward the area centroid of its face,
+        and recalculate the diagram, until no site moves more than tol,
+        or max_iter recalculations have run.
+        The diagram must already be calculated, and can already be finalised.
+        It is left finalised.
+        Returns the number of iterations run, and the last max site displacement
+        """
+        assert(not bool(self.events))
+        sites = np.array([x.loc for x in self.sites])
+        lengths = np.zeros(len(sites), dtype=int)
+        displacement = np.zeros(len(sites))
+        max_displacement = inf
+        iterations = 0
+        while True:
+            self.finalise_DCEL()
+            movement = self._get_site_centroids(lengths)
+            movement -= sites
+            movement *= amnt
+            np.hypot(movement[:,0], movement[:,1], out=displacement)
+            max_displacement = displacement.max()
+            logging.debug("Relaxation {}: max displacement {}".format(iterations, max_displacement))
+            if max_displacement < tol or iterations >= max_iter:
+                break
+            sites += movement
+            iterations += 1
+            #Sites are referenced by events and faces, so are passed in as a copy
+            self.initGraph(data=sites.copy(), rerun=True, reuse=True)
+            self.calculate_to_completion()
+            if len(self.sites) != len(sites):
+                #duplicates were removed
+                sites = np.array([x.loc for x in self.sites])
+                lengths = np.zeros(len(sites), dtype=int)
+                displacement = np.zeros(len(sites))
+
+        return iterations, max_displacement
+
+    def calculate_to_completion(self, checkpoint=None, checkpoint_steps=CHECKPOINT_STEPS):
+        """ Calculate the entire voronoi for all points.
+        If a checkpoint filename is given, save the sweep state to it every checkpoint_steps,
+        to resume from with load_checkpoint
+        """
         finished = False
         #Max Steps for a guaranteed exit
         while not finished and self.current_step < self.max_steps:
-            logging.debug("----------------------------------------")
-            logging.debug("Calculating step: {}".format(self.current_step))
+            if trace.ENABLED:
+                trace.event("voronoi.step", step=self.current_step)
             finished = self._calculate()
             if self.debug_draw:
+                if self.lazy_arcs and self.sweep_position is not None:
+                    self._update_arcs(self.sweep_position.y())
                 self.debug.draw_intermediate_states(self.current_step, dcel=True, text=True)
             self.current_step += 1
+            if checkpoint is not None and not finished \
+               and self.current_step % checkpoint_steps == 0:
+                self.save_checkpoint(checkpoint)
 
     def finalise_DCEL(self, constrain_to_bbox=True, radius=100):
         """ Cleanup the DCEL of the voronoi diagram, 
-            completing faces and constraining to a bbox 
+            completing faces and constraining to a bbox.
+            Only done once until the diagram is recalculated
         """
+        if self.finalised:
+            logging.debug("DCEL already finalised")
+            return self.dcel
         if bool(self.events):
             logging.warning("Finalising with events still to process")
         logging.debug("-------------------- Finalising DCEL")
@@ -196,8 +287,7 @@ class Voronoi:
         #Not a pure DCEL operation as it requires curve intersection:
         self._complete_edges()
         self.dcel.purge()
-        tempbbox = self.bbox + np.array([100,100,-100,-100])
-        #np.array([100,100,-100,-100])
+        tempbbox = self.bbox + FINALISE_MARGIN
         if constrain_to_bbox:
             #modify or mark edges outside bbox
             self.dcel.constrain_to_bbox(tempbbox, force=True)
@@ -207,7 +297,7 @@ class Voronoi:
         self.dcel.purge()
         logging.debug("---------- Constrained to bbox")
         #ensure CCW ordering
-        for f in self.dcel.faces:
+        for f in sorted(self.dcel.faces, key=lambda x: x.index):
             f.fixup(tempbbox)
         #cleanup faces
         logging.debug("---------- Fixed up faces")
@@ -215,8 +305,111 @@ class Voronoi:
         logging.debug("---------- Purged 3")
         logging.debug(self.dcel)
         self.dcel.verify_all()
+        self.finalised = True
         return self.dcel
 
+    def export_checkpoint(self):
+        """ Export the sweep state, using indices instead of objects,
+        so the calculation can be resumed with import_checkpoint """
+        nodes = self.beachline.get_chain()
+        node_indices = {x.id : i for i, x in enumerate(nodes)}
+        #The tree structure, as search results depend on which nodes are compared:
+        parents, reds = self.beachline.get_shape()
+        #The edges of the breakpoints between each node and its successor
+        breakpoints = [(i, self._getEdge(a, b)) for i, (a, b) in enumerate(zip(nodes, nodes[1:]))]
+        #Nodes can share an arc
+        arcs = {}
+        for node in nodes:
+            arcs.setdefault(node.value.id, (len(arcs), node.value))
+        #The active events in the order they pop:
+        queued = [x for x in sorted(self.events.heap) if x.active]
+        site_indices = {id(x) : i for i, x in enumerate(self.sites)}
+        circles = [x for x in queued if isinstance(x, CircleEvent)]
+        circle_indices = {id(x) : i for i, x in enumerate(circles)}
+        events = [[0, site_indices[id(x)]] if isinstance(x, SiteEvent)
+                  else [1, circle_indices[id(x)]] for x in queued]
+        sweep = None
+        if self.sweep_position is not None:
+            sweep = self.sweep_position.loc
+
+        return {
+            'step' : self.current_step,
+            'sweep' : sweep,
+            'bbox' : self.bbox,
+            'dcel' : self.dcel.export_data(),
+            'sites' : np.array([x.loc for x in self.sites]).reshape((-1,2)),
+            'site_faces' : np.array([x.face.index for x in self.sites], dtype=int),
+            'arcs' : np.array([[x.fx, x.fy, x.d] for i, x in arcs.values()]).reshape((-1,3)),
+            'nodes' : np.array([[arcs[x.value.id][0], x.data['face'].index, parent, red]
+                                for x, parent, red in zip(nodes, parents, reds)],
+                               dtype=int).reshape((-1,4)),
+            'edges' : np.array([[i, e.index] for i, e in breakpoints if e is not None],
+                               dtype=int).reshape((-1,2)),
+            'circle_locs' : np.array([x.loc for x in circles]).reshape((-1,2)),
+            'circle_vertices' : np.array([x.vertex for x in circles]).reshape((-1,2)),
+            'circle_data' : np.array([[node_indices.get(x.source.id, -1), x.left, x.step, x.active]
+                                      for x in circles], dtype=int).reshape((-1,4)),
+            'events' : np.array(events, dtype=int).reshape((-1,2))
+        }
+
+    def import_checkpoint(self, data):
+        """ Restore the sweep state from export_checkpoint output.
+        Only the active queued circle events are restored to self.circles """
+        self.reset()
+        self.bbox = data['bbox']
+        VEvent.offset = self.bbox[3] - self.bbox[1]
+        self.dcel.import_data(data['dcel'])
+        faces = {x.index : x for x in self.dcel.faces}
+        edges = {x.index : x for x in self.dcel.halfEdges}
+
+        self.sites = [SiteEvent(loc, face=faces[f])
+                      for loc, f in zip(data['sites'], data['site_faces'])]
+        #Rebuild the beachline with its original structure
+        arcs = [Parabola(*x) for x in data['arcs']]
+        arc_indices, face_indices, parents, reds = data['nodes'].T
+        self.beachline = rbtree.RBTree.from_shape([arcs[x] for x in arc_indices],
+                                                  parents, reds,
+                                                  cmpFunc=arc_comparison,
+                                                  eqFunc=arc_equality,
+                                                  persistent=self.keep_beachline)
+        nodes = self.beachline.get_chain()
+        for node, face in zip(nodes, face_indices):
+            node.data['face'] = faces[face]
+        for i, edge in data['edges']:
+            self._storeEdge(edges[edge], nodes[i], nodes[i+1])
+
+        circles = []
+        for loc, vertex, (node, left, step, active) in zip(data['circle_locs'],
+                                                           data['circle_vertices'],
+                                                           data['circle_data']):
+            if active:
+                circles.append(CircleEvent(loc, nodes[node], vertex, left=bool(left), i=int(step)))
+            else:
+                #cancelled events, from checkpoints that stored them, are skipped when popped
+                circles.append(VEvent(loc, i=int(step)))
+                circles[-1].active = False
+        if self.keep_circles:
+            self.circles += [x for x in circles if x.active]
+        sources = (self.sites, circles)
+        self.events.restore([sources[kind][i] for kind, i in data['events']])
+
+        self.current_step = data['step']
+        if data['sweep'] is not None:
+            self.sweep_position = VEvent(data['sweep'])
+            self.breakpoints.update_d(self.sweep_position.y())
+
+    def save_checkpoint(self, filename):
+        """ Save the sweep state, replacing any previous checkpoint only once written """
+        temp_name = "{}.tmp".format(filename)
+        with open(temp_name, 'wb') as f:
+            pickle.dump(self.export_checkpoint(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        replace(temp_name, filename)
+
+    def load_checkpoint(self, filename):
+        """ Restore the sweep state from a checkpoint file, continue with calculate_to_completion """
+        with open(filename, 'rb') as f:
+            self.import_checkpoint(pickle.load(f))
+
     def save_graph(self,values):
         with open(self.save_file_name,'wb') as f:
             pickle.dump(values,f)
@@ -231,30 +424,49 @@ class Voronoi:
     #--------------------
     # PRIVATE METHODS
     #--------------------
+    def _get_site_centroids(self, lengths):
+        """ Get the area centroids of the faces of all sites in one pass,
+        filling lengths with the number of vertices of each face.
+        Sites whose faces have been removed, or are degenerate, are their own centroid
+        """
+        coords = []
+        for i, site in enumerate(self.sites):
+            verts = []
+            if site.face in self.dcel.faces:
+                verts = [x.origin.loc for x in site.face.edgeList if x.origin is not None]
+            if len(verts) < 3:
+                verts = [site.loc]
+            lengths[i] = len(verts)
+            coords += verts
+        centroids, areas = polygon_centroids(np.array(coords), lengths)
+        return centroids
+
     def _calculate(self):
         """ Calculate the next step of the voronoi diagram,
             Return True on completion, False otherwise
         """
         if not bool(self.events): #finished calculating, early exit
             return True
-        ##Get the next event
-        event = heapq.heappop(self.events)
+        ##Get the next event, cancelled events are skipped by the queue
+        event = self.events.pop()
         #update the sweep position
         self.sweep_position = event
-        logging.debug("Sweep position: {}".format(self.sweep_position.loc))
-        #update the arcs:
-        self._update_arcs(self.sweep_position.y())
+        if trace.ENABLED:
+            trace.event("voronoi.sweep", position=self.sweep_position.loc)
+        self.breakpoints.update_d(self.sweep_position.y())
+        #update the arcs, unless they are updated on demand:
+        if not self.lazy_arcs:
+            self._update_arcs(self.sweep_position.y())
         #handle the event:
         if isinstance(event,SiteEvent):
             self._handleSiteEvent(event)
         elif isinstance(event,CircleEvent):
-            if event.active:
-                self._handleCircleEvent(event)
-            else:
-                logging.debug("-------------------- Skipping deactivated circle event")
-                logging.debug(event)
+            assert(event.active)
+            self._handleCircleEvent(event)
         else:
             raise Exception("Unrecognised Event")
+        if self.keep_beachline:
+            self.beachline_history.append(self.beachline.snapshot())
         return False 
         
     
@@ -267,7 +479,8 @@ class Voronoi:
         then update/remove any circle events that trios of arcs generate
         """
         assert(isinstance(event, SiteEvent))
-        logging.debug("Handling Site Event: {}".format(event))
+        if trace.ENABLED:
+            trace.event("voronoi.site_event", event=event)
         #The new parabola made from the site
         new_arc = Parabola(*event.loc,self.sweep_position.y())
         #get the x position of the event
@@ -282,6 +495,9 @@ class Voronoi:
         #Otherwise, slot the arc between existing nodes
         closest_node, direction = self._get_closest_arc_node(xPos)
         assert(closest_node is not None)
+        #an exact match within an arc has no direction, split it the same way as the left
+        if direction is None:
+            direction = Directions.LEFT
         #remove the obsolete circle event
         self._delete_circle_events(closest_node)
         new_node, duplicate_node  = self._split_beachline(direction,
@@ -290,20 +506,17 @@ class Voronoi:
                                                          event.face)
         
         #Create an edge between the two nodes, without origin points yet
-        logging.debug("Adding edge on side: {}".format(direction))
         node_face = closest_node.data['face']
         if direction is Directions.LEFT:
             theFace = event.face
             twinFace = node_face
-            nodePair = (new_node, closest_node)
         else:
             theFace = node_face
             twinFace = event.face
-            nodePair = (closest_node, new_node)
         
         newEdge = self.dcel.newEdge(None, None, face=theFace, twinFace=twinFace,
                                     edata=base_voronoi_edge_data, vdata=base_voronoi_vert_data)
-        self._storeEdge(newEdge, *nodePair)
+        #move the closest node's old breakpoint to the duplicate, then store the new edge
         self._cleanup_edges(direction, newEdge, new_node, closest_node, duplicate_node)
 
         #create circle events:
@@ -315,7 +528,8 @@ class Voronoi:
         then update the beachline to connect the two sides of the arc that has disappeared
         """
         assert(isinstance(event, CircleEvent))
-        logging.debug("Handling Circle Event: {}".format(event))
+        if trace.ENABLED:
+            trace.event("voronoi.circle_event", event=event)
         #remove disappearing arc from tree
         #and update breakpoints, remove false alarm circle events
         node = event.source
@@ -327,7 +541,6 @@ class Voronoi:
         self._delete_circle_events(node, pre, suc, event)
         
         #add the centre of the circle causing the event as a vertex record
-        logging.debug("Creating Vertex")
         newVertex = self.dcel.newVertex(event.vertex, data=base_voronoi_vert_data)
 
         #attach the vertex as a defined point in the half edges for the three faces,
@@ -337,7 +550,6 @@ class Voronoi:
         e2 = self._getEdge(node,suc)
 
         #create two half-edge records for the new breakpoint of the beachline
-        logging.debug("Creating a new half-edge {}-{}".format(pre,suc))
         newEdge = self.dcel.newEdge(newVertex, None,
                                     face=pre.data['face'],
                                     twinFace=suc.data['face'],
@@ -346,7 +558,6 @@ class Voronoi:
 
         if e1:
             #predecessor face
-            logging.debug("Adding vertex to {}-{}".format(pre,node))
             assert(e1.face == pre.data['face'])
             assert(e1.twin.face == node.data['face'])
             e1.addVertex(newVertex)
@@ -357,7 +568,6 @@ class Voronoi:
             
         if e2:
             #successor face
-            logging.debug("Adding vertex to {}-{}".format(node,suc))
             assert(e2.twin.face == suc.data['face'])
             assert(e2.face == node.data['face'])
             e2.addVertex(newVertex)
@@ -372,9 +582,7 @@ class Voronoi:
         self._storeEdge(newEdge,pre,suc)
 
         #delete the node, no longer needed as the arc has reduced to 0
-        logging.debug("Pre-Deletion: {}".format(self.beachline.get_chain()))
         self.beachline.delete(node)
-        logging.debug("Post-Deletion: {}".format(self.beachline.get_chain()))
         #recheck for new circle events
         if pre:
             self._calculate_circle_events(pre,left=False, right=True)
@@ -389,7 +597,6 @@ class Voronoi:
         """ if there was an edge of closest_arc -> closest_arc.successor: update it
         because closest_arc is not adjacent to successor any more, duplicate_node is """
         if direction is Directions.LEFT:
-            logging.debug("Cleaning up left")
             dup_node_sibling = duplicate_node.getPredecessor()
             if dup_node_sibling is not None:
                 e1 = self._getEdge(dup_node_sibling, node)
@@ -397,7 +604,6 @@ class Voronoi:
                     self._removeEdge(dup_node_sibling, node)
                     self._storeEdge(e1,dup_node_sibling, duplicate_node)
         else:
-            logging.debug("Cleaning up right")
             dup_node_sibling = duplicate_node.getSuccessor()
             if dup_node_sibling is not None:
                 e1 = self._getEdge(node, dup_node_sibling)
@@ -413,13 +619,12 @@ class Voronoi:
             self._storeEdge(edge.twin, new_node, duplicate_node)
         
     def _get_closest_arc_node(self, xPos):
-        #search for the breakpoint interval of the beachline
-        closest_arc_node, direction = self.beachline.search(xPos, closest=True)
-        if closest_arc_node is not None:
-            logging.debug("Closest Arc Triple: {} *{}* {}".format(closest_arc_node.getPredecessor(),
-                                                                  closest_arc_node,
-                                                                  closest_arc_node.getSuccessor()))
-            logging.debug("Direction: {}".format(direction))
+        #search for the breakpoint interval of the beachline,
+        #breakpoints are calculated at the sweep position held in the cache
+        closest_arc_node, direction = self.beachline.search(xPos, closest=True,
+                                                            cmpData=self.breakpoints)
+        if trace.ENABLED:
+            trace.event("voronoi.closest_arc", x=xPos, node=closest_arc_node, direction=direction)
         return (closest_arc_node, direction)
 
 
@@ -438,9 +643,9 @@ class Voronoi:
         new_node.data['face'] = event_face
         duplicate_node.data['face'] = node.data['face']
 
-        #Debug the new triple: [ A, B, A]
-        tripleString = "-".join([repr(x) for x in [node,new_node,duplicate_node]])
-        logging.debug("Split {} into {}".format(repr(node),tripleString))
+        #Trace the new triple: [ A, B, A]
+        if trace.ENABLED:
+            trace.event("voronoi.split", node=node, triple=(node, new_node, duplicate_node))
         return new_node, duplicate_node
 
 
@@ -449,40 +654,32 @@ class Voronoi:
         """
         Given an arc node, get the arcs either side, and determine if/when it will disappear
         """
-        logging.debug("Calculating circle events for: {}".format(node))
+        if trace.ENABLED:
+            trace.event("voronoi.calculate_circle_events", node=node, left=left, right=right)
         #Generate a circle event for left side, and right side
         left_triple = self.beachline.get_predecessor_triple(node)
         right_triple = self.beachline.get_successor_triple(node)
-        #Calculate chords and determine circle event point:
-        #add circle event to events and the relevant leaf
-        if left_triple:
-            logging.debug("Calc Left Triple: {}".format("-".join([str(x) for x in left_triple])))
-            
+        #Select the triples to check, as (triple, is left):
+        candidates = []
         if left and left_triple and left_triple[0].value != left_triple[2].value:
-            left_points = np.array([x.value.get_focus() for x in left_triple])
-            left_circle = utils.math.get_circle_3p(*left_points)
-
-            #possibly use ccw for this, with glpoc from below
-            if left_circle is not None and isClockwise(*left_points):
-                left_circle_loc = utils.math.get_lowest_point_on_circle(*left_circle)
-                #check the l_t_p/s arent in this circle
-                #note: swapped this to add on the right ftm
-                self._add_circle_event(left_circle_loc,left_triple[1],left_circle[0],left=True)
-            else:
-                logging.debug("Left points failed: {}".format(left_points))
-
-        if right_triple:
-            logging.debug("Calc Right Triple: {}".format("-".join([str(x) for x in right_triple])))
-            
+            candidates.append((left_triple, True))
         if right and right_triple and right_triple[0].value != right_triple[2].value:
-            right_points = np.array([x.value.get_focus() for x in right_triple])
-            right_circle = utils.math.get_circle_3p(*right_points)
-            if right_circle is not None and isClockwise(*right_points):
-                right_circle_loc = utils.math.get_lowest_point_on_circle(*right_circle)
-                #note: swapped this to add on the left ftm
-                self._add_circle_event(right_circle_loc,right_triple[1],right_circle[0], left=False)
-            else:
-                logging.debug("Right points failed: {}".format(right_points))
+            candidates.append((right_triple, False))
+        if not bool(candidates):
+            return
+
+        #Calculate all circles and orientations in one pass:
+        points = np.array([[x.value.get_focus() for x in triple] for triple, _ in candidates])
+        centres, radii = circumcircles(points)
+        valid = are_clockwise(points) & (radii <= MAX_CIRCLE_RADIUS)
+        lowest = get_lowest_point_on_circle(centres, radii)
+        #add circle event to events and the relevant leaf
+        #note: left triples add on the right of the node, right triples on the left
+        for i, (triple, is_left) in enumerate(candidates):
+            if valid[i]:
+                self._add_circle_event(lowest[i], triple[1], centres[i], left=is_left)
+            elif trace.ENABLED:
+                trace.event("voronoi.circle_failed", points=points[i], left=is_left)
 
     def _update_arcs(self,d):
         """ Trigger the update of all stored arcs with a new frontier line position """
@@ -494,17 +691,17 @@ class Voronoi:
         logging.debug("\n---------- Infinite Edges Completion")
         i = 0
         
-        #get only the halfedges that are originless, rather than full edges that are infinite
-        i_pairs = [x for x in self.halfEdges.items() if x[1].isInfinite()]
+        #get only the halfedges that are originless, rather than full edges that are infinite,
+        #from the breakpoints remaining on the beachline
+        chain = self.beachline.get_chain()
+        i_pairs = [(a, b, self._getEdge(a, b)) for a, b in zip(chain, chain[1:])]
+        i_pairs = [x for x in i_pairs if x[2] is not None and x[2].isInfinite()]
         logging.debug("Origin-less half edges num: {}".format(len(i_pairs)))
         
         #----
-        #i_pairs = [((breakpoint nodes),edge)]
-        for (bw,c) in i_pairs:
+        #i_pairs = [(breakpoint node, breakpoint node, edge)]
+        for (a,b,c) in i_pairs:
             i += 1
-            #a and b are nodes
-            a = bw.bp1
-            b = bw.bp2
             logging.debug("{} Infinite Edge resolution: {}-{}, infinite? {}".format(i,a,b,c.isInfinite()))
             if c.origin is None and c.twin.origin is None:
                 logging.debug("Found an undefined edge, cleaning up")
@@ -537,76 +734,67 @@ class Voronoi:
             
     #-------------------- Beachline Edge Interaction
     def _storeEdge(self,edge,bp1,bp2):
-        """ Store an incomplete edge by the 2 pairs of nodes that define the breakpoints """
+        """ Store an incomplete edge for the pair of adjacent nodes that define its breakpoint,
+        as the right edge of bp1 """
         assert(isinstance(edge, HalfEdge))
         assert(isinstance(bp1, rbtree.Node))
         assert(isinstance(bp2, rbtree.Node))
-        if self._hasEdge(bp1,bp2) and self._getEdge(bp1,bp2) != edge:
+        existing = self._getEdge(bp1,bp2)
+        if existing is not None and existing is not edge:
             raise Exception("Overrighting edge breakpoint: {}, {}".format(bp1, bp2))
-        logging.debug("Storing Edge: ({},{}): {}".format(bp1, bp2, edge))
-        self.halfEdges[BreakWrapper(bp1,bp2)] = edge
+        if trace.ENABLED:
+            trace.event("voronoi.store_edge", edge=edge, breakpoint=(bp1, bp2))
+        bp1.data[BREAKPOINT_EDGES.RIGHT] = (bp2, edge)
         
     def _hasEdge(self,bp1,bp2):
-        assert(bp1 is None or isinstance(bp1, rbtree.Node))
-        assert(bp2 is None or isinstance(bp2, rbtree.Node))
-        return BreakWrapper(bp1,bp2) in self.halfEdges
+        return self._getEdge(bp1,bp2) is not None
 
     def _getEdge(self,bp1,bp2):
+        """ Get the edge of the breakpoint between bp1 and bp2, if bp1 still stores one for bp2 """
         assert(bp1 is None or isinstance(bp1, rbtree.Node) )
         assert(bp2 is None or isinstance(bp2, rbtree.Node))
-        if self._hasEdge(bp1,bp2):
-            return self.halfEdges[BreakWrapper(bp1,bp2)]
-        else:
+        if bp1 is None or BREAKPOINT_EDGES.RIGHT not in bp1.data:
             return None
+        neighbour, edge = bp1.data[BREAKPOINT_EDGES.RIGHT]
+        if neighbour is bp2:
+            return edge
+        return None
 
     def _removeEdge(self,bp1,bp2):
         assert(isinstance(bp1, rbtree.Node))
         assert(isinstance(bp2, rbtree.Node))
         if not self._hasEdge(bp1,bp2):
             raise Exception("trying to remove a non-existing edge")
-        logging.debug("Removing Edge: ({},{}) : {}".format(bp1,bp2, self.halfEdges[BreakWrapper(bp1,bp2)]))
-        del self.halfEdges[BreakWrapper(bp1,bp2)]
+        if trace.ENABLED:
+            trace.event("voronoi.remove_edge", breakpoint=(bp1, bp2))
+        del bp1.data[BREAKPOINT_EDGES.RIGHT]
 
     #-------------------- Circle Event Interaction
     def _add_circle_event(self,loc,sourceNode,voronoiVertex,left=True):
         if loc[1] > self.sweep_position.y():# or np.allclose(loc[1],self.sweep_position.y()):
-            logging.debug("Breaking out of add circle event: Wrong side of Beachline")
             return
         event = CircleEvent(loc,sourceNode,voronoiVertex,i=self.current_step, left=left)
-        logging.debug("Adding: {}".format(event))
-        heapq.heappush(self.events,event)
-        self.circles.append(event)
+        if trace.ENABLED:
+            trace.event("voronoi.add_circle_event", event=event)
+        self.events.push(event)
+        if self.keep_circles:
+            self.circles.append(event)
 
     def _delete_circle_events(self,node, pre=None, post=None, event=None):
-        """ Deactivate a circle event rather than deleting it.
-        This means instead of removal and re-heapifying, you just skip the event
-        when you come to process it """
-        logging.debug("Deactivating Circle Event: {}".format(node))
+        """ Cancel the circle events of a node, and of its neighbours on the node's side.
+        The event queue skips cancelled events when popping, and compacts itself
+        once enough have built up, instead of re-heapifying on every cancellation """
+        if trace.ENABLED:
+            trace.event("voronoi.cancel_circle_events", node=node)
         if node is not None:
-            if CIRCLE_EVENTS.LEFT in node.data:
-                node.data[CIRCLE_EVENTS.LEFT].deactivate()
-            if CIRCLE_EVENTS.RIGHT in node.data:
-                node.data[CIRCLE_EVENTS.RIGHT].deactivate()
-
-        if pre != None and CIRCLE_EVENTS.RIGHT in pre.data:
-            pre.data[CIRCLE_EVENTS.RIGHT].deactivate()
-        if post != None and CIRCLE_EVENTS.LEFT in post.data:
-            post.data[CIRCLE_EVENTS.LEFT].deactivate()
-        
-class BreakWrapper:
-    """ A Simple Breakpoint Wrapper """
-
-    def __init__(self, bp1, bp2):
-        self.bp1 = bp1
-        self.bp2 = bp2
-        
-    def __eq__(self, other):
-        assert(isinstance(other, BreakWrapper))
-        if self.bp1 == other.bp1 and self.bp2 == other.bp2:
-            return True
-        if self.bp1.value == other.bp1.value and self.bp2.value == other.bp2.value:
-            return True
-        return False
-
-    def __hash__(self):
-        return hash((self.bp1, self.bp2))
+            self._cancel_circle_event(node, CIRCLE_EVENTS.LEFT)
+            self._cancel_circle_event(node, CIRCLE_EVENTS.RIGHT)
+        if pre is not None:
+            self._cancel_circle_event(pre, CIRCLE_EVENTS.RIGHT)
+        if post is not None:
+            self._cancel_circle_event(post, CIRCLE_EVENTS.LEFT)
+
+    def _cancel_circle_event(self, node, side):
+        """ Detach a circle event from a beachline node, and cancel it in the queue """
+        if side in node.data:
+            self.events.cancel(node.data.pop(side))
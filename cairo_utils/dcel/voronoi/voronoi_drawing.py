@@ -5,6 +5,7 @@ import numpy as np
 from math import nan
 import logging as root_logger
 import IPython
+from .Events import CircleEvent
 logging = root_logger.getLogger(__name__)
 
 #Constants:
@@ -116,7 +117,11 @@ class Voronoi_Debug:
             utils.drawing.drawCircle(self.ctx, *site.loc, SITE_RADIUS)
 
     def draw_circle_events(self):
-        for event in self.instance.circles:
+        events = self.instance.circles
+        if not self.instance.keep_circles:
+            #only the pending circle events are available
+            events = [x for x in self.instance.events if isinstance(x, CircleEvent)]
+        for event in events:
             if event.active:
                 self.ctx.set_source_rgba(*CIRCLE_COLOUR)
                 utils.drawing.drawCircle(self.ctx, *event.loc, CIRCLE_RADIUS)
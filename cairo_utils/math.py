@@ -75,57 +75,46 @@ def sample_circle(xyrs, n, sort_rads=True, sort_radi=True):
 
 def get_circle_3p(p1, p2, p3, arb_intersect=20000):
     """
-    Given 3 points, treat them as defining two chords on a circle,
-    intersect them to find the centre, then calculate the radius
-    Thus: circumcircle
+    Given 3 points, get the centre and radius of the circle through them,
+    Thus: circumcircle.
+    Returns None for collinear points, or a radius beyond arb_intersect
     """
-    #pylint: disable=too-many-locals
     assert(all([isinstance(x, np.ndarray) for x in [p1, p2, p3]]))
-    sorted_points = sort_coords(np.array([p1, p2, p3]))
-    p1 = sorted_points[0]
-    p2 = sorted_points[1]
-    p3 = sorted_points[2]
-
-    arb_height = arb_intersect
-    #mid points and norms:
-    m1 = get_midpoint(p1, p2)
-    n1 = get_bisector(m1, p2)
-    m2 = get_midpoint(p2, p3)
-    n2 = get_bisector(m2, p3)
-    #extended norms:
-    v1 = m1 + (1 * arb_height * n1)
-    v2 = m2 + (1 * arb_height * n2)
-    v1_i = m1 + (-1 * arb_height * n1)
-    v2_i = m2 + (-1 * arb_height * n2)
-    #resulting lines:
-    l1 = np.row_stack((m1, v1))
-    l2 = np.row_stack((m2, v2))
-    l1_i = np.row_stack((m1, v1_i))
-    l2_i = np.row_stack((m2, v2_i))
-    #intersect extended norms:
-    #in the four combinations of directions
-    i_1 = intersect(l1, l2)
-    i_2 = intersect(l1_i, l2_i)
-    i_3 = intersect(l1, l2_i)
-    i_4 = intersect(l1_i, l2)
-    #get the intersection:
-    the_intersect = [x for x in [i_1, i_2, i_3, i_4] if x is not None]
-    if the_intersect is None or not bool(the_intersect):
+    centres, radii = circumcircles(np.array([[p1, p2, p3]]))
+    if not radii[0] <= arb_intersect:
         return None
-    r1 = get_distance(p1, the_intersect[0])
-    r2 = get_distance(p2, the_intersect[0])
-    r3 = get_distance(p3, the_intersect[0])
+    return (centres[0], radii[0])
 
-    #a circle only if they are have the same radius
-    if np.isclose(r1, r2) and np.isclose(r2, r3):
-        return (the_intersect[0], r1)
-    else:
-        return None
+def circumcircles(triples):
+    """ Get the circumcircles of many triples of points at once, in closed form.
+    triples : (n, 3, 2)
+    Returns (n, 2) centres and (n, ) radii, both nan for collinear triples
+    """
+    assert(isinstance(triples, np.ndarray))
+    assert(triples.shape[1:] == (3, 2))
+    triples = triples.astype(float, copy=False)
+    a = triples[:, 0]
+    ab = triples[:, 1] - a
+    ac = triples[:, 2] - a
+    d = 2 * ((ab[:, 0] * ac[:, 1]) - (ab[:, 1] * ac[:, 0]))
+    ab_sq = (ab ** 2).sum(axis=1)
+    ac_sq = (ac ** 2).sum(axis=1)
+    degenerate = np.abs(d) < EPSILON
+    d[degenerate] = np.nan
+    #centres relative to the first point of each triple:
+    offsets = np.column_stack(((ac[:, 1] * ab_sq) - (ab[:, 1] * ac_sq),
+                               (ab[:, 0] * ac_sq) - (ac[:, 0] * ab_sq))) / d[:, None]
+    return a + offsets, np.hypot(offsets[:, 0], offsets[:, 1])
 
 def get_lowest_point_on_circle(centre, radius):
-    """ given the centre of a circle and a radius, get the lowest y point on that circle """
+    """ given the centre of a circle and a radius, get the lowest y point on that circle.
+    Also works on (n, 2) centres and (n, ) radii """
     #return centre + np.array([np.cos(THREEFOURTHSTWOPI) * radius,
     #                          np.sin(THREEFOURTHSTWOPI) * radius])
+    if isinstance(radius, np.ndarray) and radius.ndim == 1:
+        lowest = centre.copy()
+        lowest[:, 1] -= radius
+        return lowest
     return centre - np.array([0, radius])
 
 def in_circle(centre, radius, points):
@@ -498,6 +487,23 @@ def is_clockwise(*args, cartesian=True):
     else:
         return the_sum < 0
 
+def are_clockwise(triples, cartesian=True):
+    """ Test whether many triples of points, (n, 3, 2), are in clockwise order.
+    Matches is_clockwise for each triple """
+    assert(isinstance(triples, np.ndarray))
+    crossed = orientations(triples)
+    if cartesian:
+        return crossed <= 0
+    else:
+        return crossed > 0
+
+def orientations(triples):
+    """ The signed double area of many triples of points, (n, 3, 2),
+    positive for counter clockwise turns in cartesian coordinates """
+    ab = triples[:, 1] - triples[:, 0]
+    ac = triples[:, 2] - triples[:, 0]
+    return (ab[:, 0] * ac[:, 1]) - (ab[:, 1] * ac[:, 0])
+
 def is_counter_clockwise(a, b, c):
     """ Given 3 points, do they form a counter clockwise turn """
     assert(all([isinstance(x, np.ndarray) for x in [a, b, c]]))
@@ -606,6 +612,38 @@ def random_points(n):
     """ utility to get n 2d points """
     return np.random.random(n*2)
 
+#------------------------------
+# def polygon functions
+#------------------------------
+def polygon_centroids(xys, lengths):
+    """ Get the area centroids of many polygons in a single pass.
+    xys : (n, 2) vertices of all polygons, concatenated, each in ring order
+    lengths : (m, ) number of vertices of each polygon, all > 0
+    Returns an (m, 2) array of centroids, and the (m, ) signed areas.
+    Polygons with no area fall back to the average of their vertices
+    """
+    assert(isinstance(xys, np.ndarray))
+    lengths = np.asarray(lengths, dtype=int)
+    assert((lengths > 0).all())
+    starts = np.zeros_like(lengths)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    #index of the next vertex of each vertex, wrapping around each polygon
+    nexts = np.arange(1, len(xys) + 1)
+    nexts[starts + lengths - 1] = starts
+    xs, ys = xys[:, 0], xys[:, 1]
+    nxs, nys = xs[nexts], ys[nexts]
+    cross = (xs * nys) - (nxs * ys)
+    areas = 0.5 * np.add.reduceat(cross, starts)
+    centroids = np.column_stack((np.add.reduceat((xs + nxs) * cross, starts),
+                                 np.add.reduceat((ys + nys) * cross, starts)))
+    degenerate = np.abs(areas) < EPSILON
+    safe_areas = np.where(degenerate, 1, areas)
+    centroids /= (6 * safe_areas)[:, None]
+    if degenerate.any():
+        averages = np.add.reduceat(xys, starts) / lengths[:, None]
+        centroids[degenerate] = averages[degenerate]
+    return centroids, areas
+
 #------------------------------
 # def bbox functions
 #------------------------------
@@ -3,6 +3,7 @@ import math
 import logging as root_logger
 import IPython
 import numpy as np
+from ..Parabola import BreakpointCache
 logging = root_logger.getLogger(__name__)
 
 Directions = Enum('Directions', 'LEFT RIGHT')
@@ -25,7 +26,20 @@ def default_equality(a, b, eqData):
     """ Standard Equality test """
     return a.value == b
 
+def key_comparison(key, a, b, compData):
+    """ Smallest to largest comparison of a node's precomputed key,
+    for keyed trees. Partially apply with the key function """
+    if a.key < key(b):
+        return Directions.RIGHT
+    return Directions.LEFT
+
+def key_equality(key, a, b, eqData):
+    """ Equality test of a node's precomputed key, for keyed trees """
+    return a.key == key(b)
+
 def arc_equality(a, b, eqData):
+    """ Test an xposition is within an arc's breakpoints.
+    eqData is an optional sweep line position or cache, see __arc_intersects """
     #return true if  a.pred|a < b < a|a.succ
     l_inter, r_inter = __arc_intersects(a,b,eqData)
     result = False
@@ -39,7 +53,8 @@ def arc_equality(a, b, eqData):
 
 def arc_comparison(a, b, compData):
     """ Function to compare an arc and xposition
-    Used in Beachline/Voronoi """
+    Used in Beachline/Voronoi.
+    compData is an optional sweep line position or cache, see __arc_intersects """
     l_inter, r_inter = __arc_intersects(a,b,compData)
     pred_self = False
     self_succ = False
@@ -65,37 +80,27 @@ def arc_comparison(a, b, compData):
     return Directions.LEFT
 
 def __arc_intersects(a, b, compData):
+    """ Get the x positions of the breakpoints either side of arc a.
+    compData is one of:
+    None : use the directrix the arcs were last updated to,
+    a sweep line position : the arcs do not need to be updated to it,
+    a BreakpointCache : reuse breakpoints from earlier in the search,
+    at the cache's sweep line position
+    """
     pred = a.getPredecessor()
     succ = a.getSuccessor()
-    pred_intersect = None
-    succ_intersect = None
     pred_intersect_out = None
     succ_intersect_out = None
-    pred_above_self = None
-    succ_above_self = None
-    
-    if pred != None:
-        pred_intersect = a.value.intersect(pred.value)
-        pred_above_self = a.value.fy < pred.value.fy
-                
-    if succ != None:
-        succ_intersect = succ.value.intersect(a.value)
-        succ_above_self = a.value.fy < succ.value.fy
 
-    if pred_intersect is not None and len(pred_intersect) == 1:
-        pred_intersect_out = pred_intersect[0,0]
-    elif pred_intersect is not None and len(pred_intersect) == 2:
-        if pred_above_self:
-            pred_intersect_out = pred_intersect[0,0]
-        else:
-            pred_intersect_out = pred_intersect[1,0]
+    if isinstance(compData, BreakpointCache):
+        if pred is not None:
+            pred_intersect_out = compData.get(pred.value, a.value)
+        if succ is not None:
+            succ_intersect_out = compData.get(a.value, succ.value)
+    else:
+        if pred is not None:
+            pred_intersect_out = pred.value.breakpoint(a.value, d=compData)
+        if succ is not None:
+            succ_intersect_out = a.value.breakpoint(succ.value, d=compData)
 
-    if succ_intersect is not None and len(succ_intersect) == 1:
-        succ_intersect_out = succ_intersect[0,0]
-    elif succ_intersect is not None and len(succ_intersect) == 2:
-            if succ_above_self:
-                succ_intersect_out = succ_intersect[1,0]
-            else:
-                succ_intersect_out = succ_intersect[0,0]
-        
     return (pred_intersect_out, succ_intersect_out)
@@ -3,13 +3,18 @@ from functools import partial
 import logging as root_logger
 from string import ascii_uppercase
 import IPython
+
+from .. import trace
+
 logging = root_logger.getLogger(__name__)
 
 class Node:
     """ The Container for RBTree Data """
+    __slots__ = ("id", "left", "right", "parent", "predecessor", "successor",
+                 "size", "red", "value", "key", "_data")
     i = 0
     
-    def __init__(self,value,parent=None,data=None,eqFunc=None):
+    def __init__(self,value,parent=None,data=None):
         self.id = Node.i
         Node.i += 1
         #Children:
@@ -17,18 +22,31 @@ class Node:
         self.right = None
         #Parent:
         self.parent = parent
+        #In-order neighbours, threaded through the tree:
+        self.predecessor = None
+        self.successor = None
+        #Subtree size, maintained when the tree tracks sizes:
+        self.size = 1
         #Node Date:
         self.red = True
         self.value = value
-        self.data = {}
-        self.eqFunc = eqFunc
+        #Precomputed ordering key, for keyed trees:
+        self.key = None
+        #created on first access of data:
+        self._data = None
         if data is not None:
             assert(isinstance(data,dict))
-            self.data.update(data)
+            self._data = data.copy()
 
         #todo: create templates for data.
         #for arc/voronoi/beachline: left and right circle events
 
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = {}
+        return self._data
+
 
     #------------------------------
     # def Basic Info
@@ -63,6 +81,14 @@ class Node:
             current = current.parent
         return height
 
+    def update_size(self):
+        """ Recalculate the subtree size from the children """
+        self.size = 1
+        if self.left is not None:
+            self.size += self.left.size
+        if self.right is not None:
+            self.size += self.right.size
+
     def min(self):
         current = self
         while current.left is not None:
@@ -76,38 +102,10 @@ class Node:
         return current
 
     def getPredecessor(self):
-        if self.left is not None:
-            return self.left.max()
-        if self.parent is not None and not self.parent.on_left(self):
-            return self.parent
-        prev = self
-        current = self.parent
-        count = 0
-        while current is not None and current.right != prev:
-            prev = current
-            current = current.parent
-            count += 1
-
-        if current is not self:
-            return current
-        else:
-            return None
+        return self.predecessor
 
     def getSuccessor(self):
-        if self.right is not None:
-            return self.right.min()
-        if self.parent is not None and self.parent.on_left(self):
-            return self.parent
-        prev = self
-        current = self.parent
-        while current is not None and current.left != prev:
-            prev = current
-            current = current.parent
-
-        if current is not self:
-            return current
-        else:
-            return None
+        return self.successor
 
     def getPredecessor_while(self, condition):
         assert(isinstance(condition, (FunctionType, partial)))
@@ -147,9 +145,11 @@ class Node:
             node = None
         if self.left == None or force:
             self.link_left(node)
+            self.link_predecessor(node)
         else:
             self.getPredecessor().add_right(node)
-        logging.debug("{}: Adding {} to Left".format(self,node))
+        if trace.ENABLED:
+            trace.event("rbtree.node.add_left", node=self, child=node)
 
         
     def add_right(self,node,force=False):
@@ -157,9 +157,11 @@ class Node:
             node = None
         if self.right == None or force:
             self.link_right(node)
+            self.link_successor(node)
         else:
             self.getSuccessor().add_left(node)
-        logging.debug("{}: Adding {} to Right".format(self,node))
+        if trace.ENABLED:
+            trace.event("rbtree.node.add_right", node=self, child=node)
 
     def link_left(self,node):
         assert(node is not self)
@@ -171,7 +173,8 @@ class Node:
         self.left = node
         if self.left is not None:
             self.left.parent = self
-        logging.debug("{} L-> {}".format(self,node))
+        if trace.ENABLED:
+            trace.event("rbtree.node.link_left", node=self, child=node)
 
 
     def link_right(self,node):
@@ -184,9 +187,39 @@ class Node:
         self.right = node
         if self.right is not None:
             self.right.parent = self
-        logging.debug("{} R-> {}".format(self,node))
+        if trace.ENABLED:
+            trace.event("rbtree.node.link_right", node=self, child=node)
 
         
+    def link_predecessor(self, node):
+        """ Thread a new node into the sequence immediately before this node """
+        if node is None:
+            return
+        node.predecessor = self.predecessor
+        node.successor = self
+        if self.predecessor is not None:
+            self.predecessor.successor = node
+        self.predecessor = node
+
+    def link_successor(self, node):
+        """ Thread a new node into the sequence immediately after this node """
+        if node is None:
+            return
+        node.successor = self.successor
+        node.predecessor = self
+        if self.successor is not None:
+            self.successor.predecessor = node
+        self.successor = node
+
+    def unlink_sequence(self):
+        """ Remove this node from the threaded sequence, joining its neighbours """
+        if self.predecessor is not None:
+            self.predecessor.successor = self.successor
+        if self.successor is not None:
+            self.successor.predecessor = self.predecessor
+        self.predecessor = None
+        self.successor = None
+
     def disconnect_from_parent(self):
         parent = self.parent
         if self.parent != None:
@@ -195,7 +228,8 @@ class Node:
             else:
                 self.parent.right = None
             self.parent = None
-        logging.debug("Disconnecting {} -> {}".format(parent,self))
+        if trace.ENABLED:
+            trace.event("rbtree.node.disconnect", node=self, parent=parent)
 
             
 
@@ -204,7 +238,8 @@ class Node:
             node = self.left
             self.left = None
             node.parent = None
-            logging.debug("{} disconnecting left".format(self))
+            if trace.ENABLED:
+                trace.event("rbtree.node.disconnect_left", node=self, child=node)
             return node
         return None
 
@@ -213,7 +248,8 @@ class Node:
             node = self.right
             self.right = None
             node.parent = None
-            logging.debug("{} disconnecting right".format(self))
+            if trace.ENABLED:
+                trace.event("rbtree.node.disconnect_right", node=self, child=node)
             return node
         return None
 
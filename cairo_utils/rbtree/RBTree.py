@@ -5,6 +5,9 @@ import logging as root_logger
 from .operations import *
 from .Node import Node
 from .ComparisonFunctions import *
+from . import persistent
+from .persistent import Snapshot
+from .. import trace
 
 logging = root_logger.getLogger(__name__)
 
@@ -18,8 +21,20 @@ class RBTree:
     5) All paths from a node to its leaves contain the same number of black nodes
     """
     
-    def __init__(self, cmpFunc=None, eqFunc=None, cleanupFunc=None):
-        """ Initialise the rb tree container, ie: the node list """
+    def __init__(self, cmpFunc=None, eqFunc=None, cleanupFunc=None, track_sizes=False,
+                 persistent=False, key=None):
+        """ Initialise the rb tree container, ie: the node list.
+        track_sizes maintains subtree sizes for rank, select and count_range.
+        persistent mirrors the values for O(1) snapshots, and implies track_sizes.
+        key(value) gives a natively comparable key, stored on each node,
+        for searches without comparison callbacks
+        """
+        if key is not None:
+            assert(callable(key))
+            if cmpFunc is None:
+                cmpFunc = partial(key_comparison, key)
+            if eqFunc is None:
+                eqFunc = partial(key_equality, key)
         #Default Comparison and Equality functions with dummy data ignored
         if cmpFunc is None:
             cmpFunc = default_comparison
@@ -30,18 +45,95 @@ class RBTree:
         assert(isinstance(cmpFunc, (partial, FunctionType)))
         assert(isinstance(eqFunc, (partial, FunctionType)))
         
-        self.nodes = []
+        #node -> None, an insertion ordered registry with O(1) membership and removal
+        self.nodes = {}
+        self._count = 0
         self.root = None
         self.cmpFunc = cmpFunc
         self.eqFunc = eqFunc
         self.cleanupFunc = cleanupFunc
-        
+        self.key = key
+        self.track_sizes = track_sizes or persistent
+        self.persistent = persistent
+        #root of the path copied value sequence, when persistent:
+        self._snapshot_root = None
+
+    @staticmethod
+    def from_sorted(values, data=None, **kwargs):
+        """ Build a balanced tree from already ordered values in O(n),
+        kwargs are passed to the constructor """
+        tree = RBTree(**kwargs)
+        nodes = [Node(x, data=data) for x in values]
+        if not bool(nodes):
+            return tree
+        if tree.key is not None:
+            for node in nodes:
+                node.key = tree.key(node.value)
+        for a, b in zip(nodes, nodes[1:]):
+            a.successor = b
+            b.predecessor = a
+        #the deepest level is red unless the tree is perfect:
+        red_depth = None
+        if len(nodes) & (len(nodes) + 1):
+            red_depth = len(nodes).bit_length() - 1
+        tree.root = tree.__build_sorted(nodes, 0, len(nodes), 0, red_depth)
+        tree.nodes = dict.fromkeys(nodes)
+        tree._count = len(nodes)
+        if tree.persistent:
+            tree._snapshot_root = persistent.build([x.value for x in nodes])
+        return tree
+
+    @staticmethod
+    def from_shape(values, parents, reds, data=None, **kwargs):
+        """ Rebuild a tree exported with get_shape in O(n),
+        with the same structure and colours as the original.
+        kwargs are passed to the constructor """
+        assert(len(values) == len(parents) == len(reds))
+        tree = RBTree(**kwargs)
+        nodes = [Node(x, data=data) for x in values]
+        if not bool(nodes):
+            return tree
+        for i, (node, parent, red) in enumerate(zip(nodes, parents, reds)):
+            if tree.key is not None:
+                node.key = tree.key(node.value)
+            node.red = bool(red)
+            if parent < 0:
+                assert(tree.root is None)
+                tree.root = node
+            elif i < parent:
+                nodes[parent].link_left(node)
+            else:
+                nodes[parent].link_right(node)
+        for a, b in zip(nodes, nodes[1:]):
+            a.successor = b
+            b.predecessor = a
+        if tree.track_sizes:
+            #children come before their parents in reverse breadth first order:
+            level = [tree.root]
+            ordered = []
+            while bool(level):
+                ordered += level
+                level = [y for x in level for y in (x.left, x.right) if y is not None]
+            for node in reversed(ordered):
+                node.update_size()
+        tree.nodes = dict.fromkeys(nodes)
+        tree._count = len(nodes)
+        if tree.persistent:
+            tree._snapshot_root = persistent.build([x.value for x in nodes])
+        return tree
+
     #------------------------------
     # def Basic Access
     #------------------------------
     
     def __len__(self):
-        return len(self.nodes)
+        return self._count
+
+    def __iter__(self):
+        """ Lazily iterate the nodes from left to right """
+        if self.root is None:
+            return iter([])
+        return self.iter_from(self.root.min())
 
     def __repr__(self):
         if self.root is None:
@@ -65,16 +157,22 @@ class RBTree:
         """ Get the sequence of leaf values, from left to right """
         if self.root is None:
             return []
-        found = set()
-        chain = []
-        current = self.root.min()
-        while current is not None:
-            if current in found:
-                IPython.embed(simple_prompt=True)
-            found.add(current)
-            chain.append(current)
-            current = current.getSuccessor()
-        return chain
+        return list(self)
+
+    def get_shape(self):
+        """ Get the structure of the tree, for from_shape, as the lists
+        (parent index, is red) of the nodes from left to right. The root's parent is -1 """
+        chain = self.get_chain()
+        indices = {x.id : i for i, x in enumerate(chain)}
+        parents = [-1 if x.parent is None else indices[x.parent.id] for x in chain]
+        reds = [x.red for x in chain]
+        return parents, reds
+
+    def snapshot(self):
+        """ Get an immutable Snapshot of the current values in O(1).
+        Only for persistent trees """
+        assert(self.persistent)
+        return Snapshot(self._snapshot_root)
 
     def get_successor_triple(self,node):
         if node is None:
@@ -103,14 +201,18 @@ class RBTree:
     #------------------------------
 
     def search(self, value, cmpFunc=None, eqFunc=None,
-               cmpData=None, closest=False, start=None):
-        """ Search the tree for a value """
-        logging.debug("Searching for: {}".format(value))
-
+               cmpData=None, closest=False, start=None, hint=None):
+        """ Search the tree for a value.
+        A hint node near the value is climbed from only as far as needed,
+        instead of descending from the root """
+        if self.key is not None and cmpFunc is None and eqFunc is None and hint is None:
+            return self.__search_key(self.key(value), closest, start)
         if cmpFunc is None:
             cmpFunc = self.cmpFunc
         if eqFunc is None:
             eqFunc = self.eqFunc
+        if start is None and hint is not None:
+            start = self.__finger_start(hint, value, cmpFunc, eqFunc, cmpData)
         if start is None:
             start = self.root        
         parent = start
@@ -120,27 +222,79 @@ class RBTree:
             parent = current
             comp = cmpFunc(current, value, cmpData)
             if comp is Directions.LEFT:
-                logging.debug("left")
                 current = current.left
             else:
                 assert(comp is Directions.RIGHT)
-                logging.debug("right")
                 current = current.right
 
+        if trace.ENABLED:
+            trace.event("rbtree.search", value=value, found=current, closest=parent,
+                        direction=comp)
         if closest and current is None:
             #closest non-exact match found
-            logging.debug("Found Closest: {}, {}".format(parent, comp))
             return (parent, comp)
         elif current is None:
             #nothing found
-            logging.debug("Found Nothing")
             return (None, None)
         else:
             #exact match found
-            logging.debug("Found Exact: {}, {}".format(current, comp))
             return (current, comp)
     
     
+    def iter_from(self, node, reverse=False):
+        """ Lazily iterate the nodes from node, to the right or to the left.
+        The next node is found before yielding, so the current one can be deleted """
+        assert(node is None or isinstance(node, Node))
+        current = node
+        while current is not None:
+            following = current.predecessor if reverse else current.successor
+            yield current
+            current = following
+
+    def iter_range(self, lo, hi, cmpData=None, cmpFunc=None):
+        """ Lazily iterate the nodes within [lo, hi), as ordered by the comparison function """
+        if cmpFunc is None:
+            cmpFunc = self.cmpFunc
+        for node in self.iter_from(self.__first_not_before(lo, cmpFunc, cmpData)):
+            if cmpFunc(node, hi, cmpData) is not Directions.RIGHT:
+                return
+            yield node
+
+    def rank(self, node):
+        """ Get the number of nodes before node in the tree """
+        assert(self.track_sizes)
+        assert(isinstance(node, Node))
+        rank = 0 if node.left is None else node.left.size
+        current = node
+        while current.parent is not None:
+            if current.parent.right is current:
+                rank += 1
+                if current.parent.left is not None:
+                    rank += current.parent.left.size
+            current = current.parent
+        return rank
+
+    def select(self, k):
+        """ Get the node at index k from the left, or None if out of range """
+        assert(self.track_sizes)
+        current = self.root
+        while current is not None:
+            left_size = 0 if current.left is None else current.left.size
+            if k < left_size:
+                current = current.left
+            elif k == left_size:
+                return current
+            else:
+                k -= left_size + 1
+                current = current.right
+        return None
+
+    def count_range(self, lo, hi, cmpFunc=None, cmpData=None):
+        """ Count the nodes within [lo, hi), as ordered by the comparison function """
+        assert(self.track_sizes)
+        return max(0, self.__count_before(hi, cmpFunc, cmpData)
+                   - self.__count_before(lo, cmpFunc, cmpData))
+
     #------------------------------
     # def Public Update
     #------------------------------
@@ -153,11 +307,15 @@ class RBTree:
         for node in self.nodes:
             func(node.value, funcData)
     
-    def insert(self,*args, data=None, cmpData=None):
+    def insert(self,*args, data=None, cmpData=None, hint=None):
+        """ Insert values, a hint node starts a finger search near it,
+        and each later value is searched for from the previously inserted node """
         nodes = []
         for x in args:
-            newNode = self.__insert(x, data=data, cmpData=cmpData)
+            newNode = self.__insert(x, data=data, cmpData=cmpData, hint=hint)
             nodes.append(newNode)
+            if hint is not None:
+                hint = newNode
         return nodes
 
     def delete(self, *args, cleanupFunc=None):
@@ -167,13 +325,96 @@ class RBTree:
         toRemove = set(args)
         while bool(toRemove):
             target = toRemove.pop()
-            logging.debug("Removing Target: {}".format(target))
             assert(isinstance(target, Node))
+            if trace.ENABLED:
+                trace.event("rbtree.delete", node=target)
             if target not in self.nodes:
                 continue
             toRemove.update(cleanupFunc(target))
+            if self.persistent:
+                self._snapshot_root = persistent.delete(self._snapshot_root, self.rank(target))
             rbTreeDelete(self,target)
-            self.nodes.remove(target)
+            target.unlink_sequence()
+            del self.nodes[target]
+            self._count -= 1
+
+    def split(self, value, cmpData=None):
+        """ Split the tree, keeping the nodes the comparison function
+        places before value, and returning a new tree of the rest.
+        Restructuring is O(log n), moving the registry entries of
+        the smaller side is O(min(n1, n2)) """
+        if trace.ENABLED:
+            trace.event("rbtree.split", value=value)
+        other = RBTree(cmpFunc=self.cmpFunc, eqFunc=self.eqFunc,
+                       cleanupFunc=self.cleanupFunc, track_sizes=self.track_sizes,
+                       persistent=self.persistent, key=self.key)
+        left, right = split_nodes(other, self.root, value, self.cmpFunc, cmpData)
+        self.root = left
+        other.root = right
+        if self.persistent:
+            split_at = 0 if left is None else left.size
+            self._snapshot_root, other._snapshot_root = persistent.split(self._snapshot_root,
+                                                                         split_at)
+        if left is None or right is None:
+            if left is None:
+                self.nodes, other.nodes = other.nodes, self.nodes
+                self._count, other._count = other._count, self._count
+            return other
+
+        last, first = left.max(), right.min()
+        last.successor = None
+        first.predecessor = None
+        #move the registry entries of the smaller side:
+        a, b = left.min(), first
+        while a is not None and b is not None:
+            a, b = a.successor, b.successor
+        if b is None:
+            moved = first
+            source, dest = self.nodes, other.nodes
+        else:
+            moved = left.min()
+            self.nodes, other.nodes = other.nodes, self.nodes
+            source, dest = other.nodes, self.nodes
+        while moved is not None:
+            del source[moved]
+            dest[moved] = None
+            moved = moved.successor
+        self._count = len(self.nodes)
+        other._count = len(other.nodes)
+        return other
+
+    def join(self, other):
+        """ Append all nodes of other, which must all come after this tree's,
+        leaving other empty. Restructuring is O(log n), merging
+        the smaller registry into the larger is O(min(n1, n2)) """
+        assert(isinstance(other, RBTree))
+        assert(self.track_sizes == other.track_sizes)
+        assert(self.persistent == other.persistent)
+        if trace.ENABLED:
+            trace.event("rbtree.join", other=other)
+        if other.root is None:
+            return self
+        if self.root is not None:
+            mid = other.root.min()
+            last = self.root.max()
+            last.successor = mid
+            mid.predecessor = last
+            rbTreeDelete(other, mid)
+            join_nodes(self, self.root, mid, other.root)
+        else:
+            self.root = other.root
+        #merge the smaller registry into the larger:
+        if len(self.nodes) < len(other.nodes):
+            self.nodes, other.nodes = other.nodes, self.nodes
+        self.nodes.update(other.nodes)
+        self._count = len(self.nodes)
+        other.nodes = {}
+        other._count = 0
+        other.root = None
+        if self.persistent:
+            self._snapshot_root = persistent.merge(self._snapshot_root, other._snapshot_root)
+            other._snapshot_root = None
+        return self
 
     def delete_value(self,*args, cmpFunc=None, eqFunc=None, cleanupFunc=None,
                      cmpData=None):
@@ -188,9 +429,9 @@ class RBTree:
     #------------------------------
     # def Private Update
     #------------------------------
-    def __insert(self,value,data=None, cmpData=None):
+    def __insert(self,value,data=None, cmpData=None, hint=None):
         """ Insert a value into the tree """
-        parent, direction = self.search(value, closest=True, cmpData=cmpData)
+        parent, direction = self.search(value, closest=True, cmpData=cmpData, hint=hint)
         if direction is Directions.LEFT:
             return self.insert_predecessor(parent, value, data=data)
         else:
@@ -199,28 +440,140 @@ class RBTree:
 
     def insert_successor(self,existing_node,newValue, data=None):
         assert(existing_node is None or isinstance(existing_node, Node))
-        logging.debug("Inserting Successor")
         new_node = Node(newValue, data=data)
-        self.nodes.append(new_node)
+        if self.key is not None:
+            new_node.key = self.key(newValue)
+        if trace.ENABLED:
+            trace.event("rbtree.insert_successor", node=new_node, existing=existing_node)
+        self.nodes[new_node] = None
+        self._count += 1
         if existing_node is None:
             self.root = new_node
         else:
             existing_node.add_right(new_node)
+        if self.track_sizes:
+            self.__resize_ancestors(new_node)
         self.__balance(new_node)
+        if self.persistent:
+            self._snapshot_root = persistent.insert(self._snapshot_root, self.rank(new_node),
+                                                    newValue)
         return new_node
 
     def insert_predecessor(self,existing_node,newValue, data=None):
         assert(existing_node is None or isinstance(existing_node, Node))
-        logging.debug("Inserting predecessor")
         new_node = Node(newValue, data=data)
-        self.nodes.append(new_node)
+        if self.key is not None:
+            new_node.key = self.key(newValue)
+        if trace.ENABLED:
+            trace.event("rbtree.insert_predecessor", node=new_node, existing=existing_node)
+        self.nodes[new_node] = None
+        self._count += 1
         if existing_node == None:
             self.root = new_node
         else:
             existing_node.add_left(new_node)
+        if self.track_sizes:
+            self.__resize_ancestors(new_node)
         self.__balance(new_node)
+        if self.persistent:
+            self._snapshot_root = persistent.insert(self._snapshot_root, self.rank(new_node),
+                                                    newValue)
         return new_node
 
+    def __count_before(self, value, cmpFunc=None, cmpData=None):
+        """ Count the nodes the comparison function places before value """
+        if cmpFunc is None:
+            cmpFunc = self.cmpFunc
+        count = 0
+        current = self.root
+        while current is not None:
+            if cmpFunc(current, value, cmpData) is Directions.RIGHT:
+                count += 1
+                if current.left is not None:
+                    count += current.left.size
+                current = current.right
+            else:
+                current = current.left
+        return count
+
+    def __search_key(self, key, closest=False, start=None):
+        """ Search by native comparison of precomputed node keys,
+        with the same ordering and results as search """
+        if start is None:
+            start = self.root
+        parent = start
+        current = start
+        comp = None
+        while current is not None:
+            current_key = current.key
+            if current_key == key:
+                break
+            parent = current
+            if current_key < key:
+                comp = Directions.RIGHT
+                current = current.right
+            else:
+                comp = Directions.LEFT
+                current = current.left
+
+        if trace.ENABLED:
+            trace.event("rbtree.search", value=key, found=current, closest=parent,
+                        direction=comp)
+        if closest and current is None:
+            return (parent, comp)
+        elif current is None:
+            return (None, None)
+        return (current, comp)
+
+    def __finger_start(self, hint, value, cmpFunc, eqFunc, cmpData=None):
+        """ Climb from hint to the lowest node whose subtree the value must be within.
+        Only the ancestors beyond the hint, in the direction of the value, are compared """
+        assert(isinstance(hint, Node))
+        if eqFunc(hint, value, cmpData):
+            return hint
+        direction = cmpFunc(hint, value, cmpData)
+        current = hint
+        while current.parent is not None:
+            parent = current.parent
+            if (parent.left is current) == (direction is Directions.RIGHT):
+                if eqFunc(parent, value, cmpData):
+                    return parent
+                if cmpFunc(parent, value, cmpData) is not direction:
+                    return current
+            current = parent
+        return current
+
+    def __first_not_before(self, value, cmpFunc, cmpData=None):
+        """ Get the leftmost node the comparison function does not place before value """
+        found = None
+        current = self.root
+        while current is not None:
+            if cmpFunc(current, value, cmpData) is Directions.RIGHT:
+                current = current.right
+            else:
+                found = current
+                current = current.left
+        return found
+
+    def __resize_ancestors(self, node):
+        """ Add a newly inserted leaf to the sizes of its ancestors """
+        current = node.parent
+        while current is not None:
+            current.size += 1
+            current = current.parent
+
+    def __build_sorted(self, nodes, lo, hi, depth, red_depth):
+        """ Link nodes[lo:hi] into a balanced subtree, returning its root """
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        node = nodes[mid]
+        node.red = depth == red_depth
+        node.link_left(self.__build_sorted(nodes, lo, mid, depth + 1, red_depth))
+        node.link_right(self.__build_sorted(nodes, mid + 1, hi, depth + 1, red_depth))
+        node.size = hi - lo
+        return node
+
     def __balance(self, node):
         assert(isinstance(node, Node))
         rbtreeFixup(self, node)
@@ -9,3 +9,4 @@
 from .RBTree import RBTree
 from .Node import Node
 from .ComparisonFunctions import Directions
+from .persistent import Snapshot
@@ -1,6 +1,7 @@
 import logging as root_logger
 from .Node import Node
 from .ComparisonFunctions import Directions
+from .. import trace
 import IPython
 
 logging = root_logger.getLogger(__name__)
@@ -9,26 +10,35 @@ logging = root_logger.getLogger(__name__)
 #todo: integrate these into the beachline class 
 def rotateLeft(tree,node):
     """ Rotate the given node left, making the new head be node.right """
-    logging.debug("Rotating Left: {}".format(node))
+    if trace.ENABLED:
+        trace.event("rbtree.rotate_left", node=node)
     assert(isinstance(node,Node))
     assert(node.right is not None)
     setAsRoot, newHead = node.rotate_left()
     if setAsRoot:
         tree.root = newHead
+    if tree.track_sizes:
+        node.update_size()
+        newHead.update_size()
     return newHead
 
 def rotateRight(tree,node):
     """ Rotate the given node right, making the new head be node.left """
-    logging.debug("Rotating Right: {}".format(node))
+    if trace.ENABLED:
+        trace.event("rbtree.rotate_right", node=node)
     assert(isinstance(node, Node))
     assert(node.left is not None)
     setAsRoot, newHead = node.rotate_right()
     if setAsRoot:
         tree.root = newHead
+    if tree.track_sizes:
+        node.update_size()
+        newHead.update_size()
     return newHead
         
 def rbtreeFixup(tree,node):
-    """ Verify and fix the RB properties hold """
+    """ Verify and fix the RB properties hold.
+    Returns whether the root was recoloured, adding to the tree's black height """
     while node.parent != None and node.parent.red:
         parent = node.parent
         grandParent = parent.parent
@@ -62,25 +72,25 @@ def rbtreeFixup(tree,node):
                 node.parent.red = False
                 node.parent.parent.red = True
                 rotateLeft(tree,node.parent.parent)
+    recoloured = tree.root.red
     tree.root.red = False
+    return recoloured
 
 def transplant(tree,target,replacement):
     """ Transplant the node replacement, and its subtree, 
     in place of node target """
-    #logging.debug("Transplanting {} into {}".format(replacement,target))
+    if trace.ENABLED:
+        trace.event("rbtree.transplant", target=target, replacement=replacement)
     if replacement is not None:
         replacement.disconnect_from_parent()
 
     if target.parent == None:
-        logging.debug("Setting root to {}".format(replacement))
         tree.root = replacement
     elif target.parent.on_left(target):
-        logging.debug("Transplant linking left")
         parent = target.parent
         target.disconnect_from_parent()
         parent.link_left(replacement)
     else:
-        logging.debug("Transplant linking right")
         parent = target.parent
         target.disconnect_from_parent()
         parent.link_right(replacement)
@@ -90,87 +100,198 @@ def rbTreeDelete(tree,node):
     target = node 
     target_originally_red = target.red
     current = None
-    logging.debug("Deleting Node: {}".format(node))
+    if trace.ENABLED:
+        trace.event("rbtree.delete_node", node=node)
+    #the lowest node whose subtree changed, and the parent of current,
+    #which is needed for the fixup when current is a null leaf:
+    resize_from = target.parent
+    current_parent = target.parent
     if target.left is None:
-        logging.debug("No left, transplanting right")
         current = target.right
         transplant(tree,target,target.right)
     elif target.right is None:
-        logging.debug("No right, transplanting left")
         current = target.left
         transplant(tree,target,target.left)
     else:
-        logging.debug("Both Left and right exist")
         target = target.right.min()
         target_originally_red = target.red
         current = target.right
         if target.parent == node:
+            resize_from = target
+            current_parent = target
             if current != None:
-                logging.debug("target.parent == node")
                 target.disconnect_from_parent()
                 current.parent = target
         else:
-            logging.debug("target.parent != node")
+            resize_from = target.parent
+            current_parent = target.parent
             transplant(tree,target,target.right)
             target.link_right(node.right)
 
         transplant(tree,node,target)
         target.link_left(node.left)
         target.red = node.red
+
+    if tree.track_sizes:
+        resize_path(resize_from)
         
     if not target_originally_red:
-        logging.debug("Fixing up current: {}".format(current))
-        rbDeleteFixup(tree,current)
-    
-def rbDeleteFixup(tree,node):
-    while node != tree.root and node is not None and not node.red:
-        if node.parent.on_left(node):
-            w = node.parent.right
-            if w is not None and w.red:
+        if trace.ENABLED:
+            trace.event("rbtree.delete_fixup", node=current)
+        rbDeleteFixup(tree,current,current_parent)
+
+def resize_path(node):
+    """ Recalculate subtree sizes from node up to the root """
+    while node is not None:
+        node.update_size()
+        node = node.parent
+
+def rbDeleteFixup(tree,node,parent):
+    """ Restore the black height after removing a black node,
+    node may be a null leaf, so its parent is passed in """
+    while node is not tree.root and (node is None or not node.red):
+        if parent.left is node:
+            w = parent.right
+            if w.red:
                 w.red = False
-                node.parent.red = True
-                rotateLeft(tree,node.parent)
-                w = node.parent.right
-            if w is not None and (w.left is None or not w.left.red) and \
+                parent.red = True
+                rotateLeft(tree,parent)
+                w = parent.right
+            if (w.left is None or not w.left.red) and \
                (w.right is None or not w.right.red):
                 w.red = True
-                node = node.parent
-            elif w is not None:
+                node = parent
+                parent = node.parent
+            else:
                 if w.right is None or not w.right.red:
                     w.left.red = False
                     w.red = True
                     rotateRight(tree,w)
-                    w = node.parent.right
-                w.red = node.parent.red
-                node.parent.red = False
+                    w = parent.right
+                w.red = parent.red
+                parent.red = False
                 w.right.red = False
-                rotateLeft(tree,node.parent)
+                rotateLeft(tree,parent)
                 node = tree.root
+                parent = None
         else: #mirror for right
-            w = node.parent.left
-            if w is not None and w.red:
+            w = parent.left
+            if w.red:
                 w.red = False
-                node.parent.red = True
-                rotateRight(tree,node.parent)
-                w = node.parent.left
-            if w is not None and (w.left is None or not w.left.red) and \
+                parent.red = True
+                rotateRight(tree,parent)
+                w = parent.left
+            if (w.left is None or not w.left.red) and \
                (w.right is None or not w.right.red):
                 w.red = True
-                node = node.parent
-            elif w is not None:
+                node = parent
+                parent = node.parent
+            else:
                 if w.left is None or not w.left.red:
                     w.right.red = False
                     w.red = True
                     rotateLeft(tree,w)
-                    w = node.parent.left
-                w.red = node.parent.red
-                node.parent.red = False
+                    w = parent.left
+                w.red = parent.red
+                parent.red = False
                 w.left.red = False
-                rotateRight(tree,node.parent)
+                rotateRight(tree,parent)
                 node = tree.root
+                parent = None
+    if node is not None:
         node.red = False
-        if w is None:
-            node = None
- 
 
 
+def black_height(node):
+    """ Count the black nodes from node down its left spine """
+    height = 0
+    while node is not None:
+        if not node.red:
+            height += 1
+        node = node.left
+    return height
+
+def join_nodes(tree, left, mid, right):
+    """ Join the detached subtrees left and right either side of the
+    detached node mid, into a valid tree set as tree.root. O(log n) """
+    return _join_nodes(tree, left, black_height(left), mid, right, black_height(right))[0]
+
+def _join_nodes(tree, left, left_height, mid, right, right_height):
+    """ Join with the known black heights of left and right, returning the
+    root and its black height. O(difference in heights + 1) """
+    assert(isinstance(mid, Node))
+    assert(left is None or left.parent is None)
+    assert(right is None or right.parent is None)
+    mid.left = mid.right = mid.parent = None
+    if left is not None and left.red:
+        left.red = False
+        left_height += 1
+    if right is not None and right.red:
+        right.red = False
+        right_height += 1
+    if left_height == right_height:
+        mid.link_left(left)
+        mid.link_right(right)
+        mid.red = False
+        if tree.track_sizes:
+            mid.update_size()
+        tree.root = mid
+        return (mid, left_height + 1)
+
+    #find the black node of equal height on the taller side to replace:
+    parent = None
+    if left_height > right_height:
+        tree.root = left
+        current, height = left, left_height
+        while current is not None and (current.red or height != right_height):
+            if not current.red:
+                height -= 1
+            parent, current = current, current.right
+        if current is not None:
+            current.disconnect_from_parent()
+        parent.link_right(mid)
+        mid.link_left(current)
+        mid.link_right(right)
+    else:
+        tree.root = right
+        current, height = right, right_height
+        while current is not None and (current.red or height != left_height):
+            if not current.red:
+                height -= 1
+            parent, current = current, current.left
+        if current is not None:
+            current.disconnect_from_parent()
+        parent.link_left(mid)
+        mid.link_left(left)
+        mid.link_right(current)
+
+    mid.red = True
+    if tree.track_sizes:
+        mid.update_size()
+        resize_path(parent)
+    #the height only grows if the fixup recolours the root:
+    grew = rbtreeFixup(tree, mid)
+    return (tree.root, max(left_height, right_height) + int(grew))
+
+def split_nodes(tree, node, value, cmpFunc, cmpData=None):
+    """ Split the detached subtree of node into the (left, right) roots of the
+    nodes the comparison places before value, and the rest.
+    Uses the threaded neighbours, so the sequence must be intact. O(log n) """
+    left, right = _split_nodes(tree, node, black_height(node), value, cmpFunc, cmpData)
+    return (left[0], right[0])
+
+def _split_nodes(tree, node, height, value, cmpFunc, cmpData):
+    """ Split with the known black height of node, returning the
+    (root, black height) of each side, so joins don't recount them """
+    if node is None:
+        return ((None, 0), (None, 0))
+    child_height = height if node.red else height - 1
+    left = node.disconnect_left()
+    right = node.disconnect_right()
+    if cmpFunc(node, value, cmpData) is Directions.RIGHT:
+        (sub_left, sub_left_height), sub_right = _split_nodes(tree, right, child_height,
+                                                              value, cmpFunc, cmpData)
+        return (_join_nodes(tree, left, child_height, node, sub_left, sub_left_height), sub_right)
+    sub_left, (sub_right, sub_right_height) = _split_nodes(tree, left, child_height,
+                                                           value, cmpFunc, cmpData)
+    return (sub_left, _join_nodes(tree, sub_right, sub_right_height, node, right, child_height))
@@ -0,0 +1,128 @@
+""" persistent.py : Immutable snapshots of an RBTree's values, for persistent trees.
+    A persistent RBTree mirrors its sequence of values in a path copied treap,
+    indexed by rank instead of by value, as the comparison functions of
+    the beachline depend on neighbours and the sweep line.
+    Treap nodes are tuples of (left, value, right, size, priority), and are
+    never modified, so each mutation copies O(log n) of them, and a snapshot
+    is just the current root.
+"""
+import logging as root_logger
+from random import random
+
+logging = root_logger.getLogger(__name__)
+
+LEFT, VALUE, RIGHT, SIZE, PRIORITY = range(5)
+
+
+class Snapshot:
+    """ The sequence of values in an RBTree when the snapshot was taken """
+    __slots__ = ("_root",)
+
+    def __init__(self, root=None):
+        self._root = root
+
+    def __len__(self):
+        return _size(self._root)
+
+    def __iter__(self):
+        """ Iterate the values from left to right """
+        stack = []
+        current = self._root
+        while bool(stack) or current is not None:
+            while current is not None:
+                stack.append(current)
+                current = current[LEFT]
+            current = stack.pop()
+            yield current[VALUE]
+            current = current[RIGHT]
+
+    def __getitem__(self, i):
+        """ Get the value at index i, in O(log n) """
+        length = len(self)
+        if i < 0:
+            i += length
+        if not 0 <= i < length:
+            raise IndexError("Snapshot index out of range: {}".format(i))
+        current = self._root
+        while True:
+            left_size = _size(current[LEFT])
+            if i < left_size:
+                current = current[LEFT]
+            elif i == left_size:
+                return current[VALUE]
+            else:
+                i -= left_size + 1
+                current = current[RIGHT]
+
+    def __repr__(self):
+        return "Snapshot( Len: {})".format(len(self))
+
+
+#--------------------
+# PERSISTENT TREAP FUNCTIONS
+#--------------------
+def build(values):
+    """ Build a balanced treap of values in O(n) """
+    values = list(values)
+    if not bool(values):
+        return None
+    #assign the highest priorities in breadth first order, keeping the heap property:
+    priorities = sorted((random() for x in values), reverse=True)
+    level_order = {}
+    ranges = [(0, len(values))]
+    for lo, hi in ranges:
+        if lo >= hi:
+            continue
+        mid = (lo + hi) // 2
+        level_order[mid] = priorities[len(level_order)]
+        ranges += [(lo, mid), (mid + 1, hi)]
+
+    def build_range(lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        return _make(build_range(lo, mid), values[mid], build_range(mid + 1, hi),
+                     level_order[mid])
+    return build_range(0, len(values))
+
+def insert(root, i, value):
+    """ Get a new root with value inserted at index i """
+    left, right = split(root, i)
+    return merge(merge(left, _make(None, value, None, random())), right)
+
+def delete(root, i):
+    """ Get a new root with the value at index i removed """
+    left, right = split(root, i)
+    _, right = split(right, 1)
+    return merge(left, right)
+
+def split(root, i):
+    """ Split into new roots of the first i values, and the rest """
+    if root is None:
+        return (None, None)
+    left_size = _size(root[LEFT])
+    if i <= left_size:
+        left, right = split(root[LEFT], i)
+        return (left, _make(right, root[VALUE], root[RIGHT], root[PRIORITY]))
+    left, right = split(root[RIGHT], i - left_size - 1)
+    return (_make(root[LEFT], root[VALUE], left, root[PRIORITY]), right)
+
+def merge(a, b):
+    """ Get a new root of the values of a followed by those of b """
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a[PRIORITY] > b[PRIORITY]:
+        return _make(a[LEFT], a[VALUE], merge(a[RIGHT], b), a[PRIORITY])
+    return _make(merge(a, b[LEFT]), b[VALUE], b[RIGHT], b[PRIORITY])
+
+
+#--------------------
+# PRIVATE FUNCTIONS
+#--------------------
+def _size(node):
+    return 0 if node is None else node[SIZE]
+
+def _make(left, value, right, priority):
+    return (left, value, right, _size(left) + _size(right) + 1, priority)
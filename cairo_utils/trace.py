@@ -0,0 +1,59 @@
+""" trace.py : Structured tracing of hot paths, that costs a flag check when disabled.
+    Call sites guard each event with the module flag, so no message
+    formatting, counting or hooks happen unless tracing is enabled:
+
+        if trace.ENABLED:
+            trace.event("dcel.newVertex", index=newVert.index, reused=False)
+
+    When enabled, each event is counted, passed to the hooks registered for it
+    (or for all events), and optionally logged at DEBUG.
+"""
+import logging as root_logger
+from collections import Counter, defaultdict
+
+logging = root_logger.getLogger(__name__)
+
+#Checked at every call site, set with enable/disable
+ENABLED = False
+#Log each event at DEBUG when enabled
+LOG_EVENTS = True
+
+#event name -> number of times it has been traced
+counters = Counter()
+#event name -> [hook(name, data)], None registers a hook for all events
+hooks = defaultdict(list)
+_log_events = LOG_EVENTS
+
+
+def enable(log=LOG_EVENTS):
+    """ Start tracing events, optionally logging each of them """
+    global ENABLED, _log_events
+    ENABLED = True
+    _log_events = log
+
+def disable():
+    """ Stop tracing, call sites go back to only checking ENABLED """
+    global ENABLED
+    ENABLED = False
+
+def event(name, **data):
+    """ Record a traced event. Only called behind a check of ENABLED """
+    counters[name] += 1
+    for hook in hooks.get(name, []) + hooks.get(None, []):
+        hook(name, data)
+    if _log_events:
+        logging.debug("%s: %s", name, data)
+
+def add_hook(hook, name=None):
+    """ Register a hook(name, data) for an event, or all events if name is None """
+    assert(callable(hook))
+    hooks[name].append(hook)
+
+def remove_hook(hook, name=None):
+    if hook in hooks.get(name, []):
+        hooks[name].remove(hook)
+
+def reset():
+    """ Clear the counters and hooks """
+    counters.clear()
+    hooks.clear()
@@ -2,6 +2,8 @@ import unittest
 import logging
 import IPython
 import numpy as np
+import tempfile
+from os.path import join
 from random import shuffle
 from math import radians
 from test_context import cairo_utils as utils
@@ -289,6 +291,94 @@ class DCEL_ACTUAL_Tests(unittest.TestCase):
         self.assertFalse(e in self.dc.halfEdges)
         self.assertFalse(e_twin in self.dc.halfEdges)
         self.assertTrue(v3 in self.dc.vertices)
+
+    def test_vertex_index_move(self):
+        """ Moving a vertex updates the quad tree, so newVertex reuses it at its new location """
+        v = self.dc.newVertex(np.array([0,0]))
+        v.translate(np.array([5,5]), abs=True, force=True)
+        self.assertIs(self.dc.newVertex(np.array([5,5])), v)
+        self.assertIsNot(self.dc.newVertex(np.array([0,0])), v)
+        self.assertEqual(self.dc.vertex_quad_tree.countmembers(), 2)
+
+    def test_vertex_index_move_stacked(self):
+        v = self.dc.newVertex(np.array([0,0]))
+        with self.dc:
+            v.loc = np.array([3,3])
+        self.assertEqual(self.dc.vertex_quad_tree.intersect(v.bbox()), set([v]))
+        self.assertEqual(self.dc.vertex_quad_tree.intersect(dcel.Vertex.free_bbox(np.array([0,0]))),
+                         set())
+
+    def test_purge_vertex_index(self):
+        v1 = self.dc.newVertex(np.array([0,0]))
+        v2 = self.dc.newVertex(np.array([1,1]))
+        v1.markForCleanup()
+        self.dc.purge()
+        self.assertFalse(v1 in self.dc.vertex_quad_tree)
+        self.assertTrue(v2 in self.dc.vertex_quad_tree)
+        self.assertIsNot(self.dc.newVertex(np.array([0,0])), v1)
+
+    def test_vertex_index_rebuild(self):
+        self.dc = dcel.DCEL(index_type=dcel.QuadTreeIndex)
+        verts = [self.dc.newVertex(np.array([x, x])) for x in range(100)]
+        for v in verts[:90]:
+            self.dc.unindex_vertex(v)
+        self.assertEqual(self.dc.vertex_quad_tree.countmembers(), 10)
+        found = self.dc.vertex_quad_tree.intersect(np.array([-200,-200,200,200]))
+        self.assertEqual(found, set(verts[90:]))
+        self.assertEqual(self.dc.vertex_quad_tree.intersect(verts[0].bbox()), set())
+        self.dc.vertex_quad_tree.rebuild()
+        found = self.dc.vertex_quad_tree.intersect(np.array([-200,-200,200,200]))
+        self.assertEqual(found, set(verts[90:]))
+
+    def test_newVertices(self):
+        existing = self.dc.newVertex(np.array([5,5]))
+        locs = np.array([[0,0],[1,1],[0,0],[5,5],[1,1 + 1e-9],[2,2]])
+        verts = self.dc.newVertices(locs)
+        self.assertEqual(len(verts), 6)
+        self.assertIs(verts[0], verts[2])
+        self.assertIs(verts[1], verts[4])
+        self.assertIs(verts[3], existing)
+        self.assertEqual(len(set(verts)), 4)
+        self.assertEqual(len(self.dc.vertices), 4)
+        self.assertTrue(all([np.allclose(v.loc, l) for v, l in zip(verts, locs)]))
+        self.assertEqual(self.dc.newVertices(np.zeros((0,2))), [])
+
+    def test_vertex_index_types(self):
+        """ Grid and quad tree indices give the same results """
+        items = np.random.random((200, 4)) * 20
+        items[:, 2:] = items[:, :2] + np.random.random((200, 2)) * 3
+        queries = np.random.random((50, 4)) * 20
+        indices = [dcel.GridIndex(cell_size=0.5), dcel.QuadTreeIndex(bbox=np.array([0,0,20,20]))]
+        for index in indices:
+            for i, bbox in enumerate(items):
+                index.insert(i, bbox)
+            for i in range(0, 200, 3):
+                index.remove(i)
+            for i in range(1, 200, 3):
+                index.move(i, items[i] + 1)
+            self.assertEqual(len(index), 133)
+        #include queries touching the edges of items:
+        touching = [np.concatenate((items[5][2:], items[5][2:] + 1)),
+                    np.concatenate((items[8][:2] - 1, items[8][:2]))]
+        for bbox in list(queries) + touching:
+            results = [index.intersect(bbox) for index in indices]
+            self.assertEqual(results[0], results[1])
+        self.assertIn(5, indices[0].intersect(touching[0]))
+        self.assertIn(8, indices[0].intersect(touching[1]))
+
+    def test_quad_tree_index_dcel(self):
+        self.dc = dcel.DCEL(bbox=np.array([-10,-10,20,20]), index_type=dcel.QuadTreeIndex)
+        self.assertIsInstance(self.dc.vertex_quad_tree, dcel.QuadTreeIndex)
+        v1 = self.dc.newVertex(np.array([0,0]))
+        v2 = self.dc.newVertex(np.array([1,1]))
+        self.assertIs(self.dc.newVertex(np.array([0,0])), v1)
+        v2.loc = np.array([5,5])
+        self.assertIs(self.dc.newVertex(np.array([5,5])), v2)
+        self.assertIsNot(self.dc.newVertex(np.array([1,1])), v2)
+        v1.markForCleanup()
+        self.dc.purge()
+        self.assertFalse(v1 in self.dc.vertex_quad_tree)
+        self.assertIsNot(self.dc.newVertex(np.array([0,0])), v1)
         
 
     def test_purge_faces(self):
@@ -398,6 +488,89 @@ class DCEL_ACTUAL_Tests(unittest.TestCase):
         self.assertEqual(len(newDCEL.halfEdges), 4)
         self.assertEqual(len(newDCEL.faces), 2)        
 
+    def test_save_load_columnar(self):
+        self.dc.newFace(np.array([1,1]), coords=np.array([[0,0],[2,0],[2,2],[0,2]]),
+                        data={dcel.FaceE.FILL : [1,0,0,1]})
+        self.dc.createEdge(np.array([5,5]), np.array([6,6]), edata={"b": 3})
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = join(tmp, "dcel_actual_columns_test")
+            self.dc.savefile(filename, columnar=True)
+            newDCEL = dcel.DCEL.loadfile(filename)
+        self.assertEqual(len(newDCEL.vertices), 6)
+        self.assertEqual(len(newDCEL.halfEdges), 10)
+        self.assertEqual(len(newDCEL.faces), 1)
+        for key in ['vertices', 'halfEdges', 'faces']:
+            original = sorted(self.dc.export_data()[key], key=lambda x: x['i'])
+            result = sorted(newDCEL.export_data()[key], key=lambda x: x['i'])
+            for x in original + result:
+                if 'halfEdges' in x:
+                    x['halfEdges'] = sorted(x['halfEdges'])
+            self.assertEqual(original, result)
+        self.assertIs(newDCEL.newVertex(np.array([5,5])),
+                      [x for x in newDCEL.vertices if np.allclose(x.loc, [5,5])][0])
+
+    def test_load_arrays_mmap(self):
+        self.dc.newFace(np.array([1,1]), coords=np.array([[0,0],[2,0],[2,2],[0,2]]),
+                        data={dcel.FaceE.FILL : [1,0,0,1]})
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = join(tmp, "dcel_actual_columns_test")
+            self.dc.savefile(filename, columnar=True)
+            arrays = dcel.DCELArrays.load("{}.dcel".format(filename))
+            self.assertIsInstance(arrays.coords, np.memmap)
+            self.assertIsInstance(arrays.origin, np.memmap)
+            self.assertIsNone(arrays._face_data)
+            centroids, areas = arrays.face_centroids()
+            self.assertTrue(np.allclose(centroids[0], [1,1]))
+            #the data pickle is read on first access:
+            self.assertEqual(arrays.face_data, [{dcel.FaceE.FILL : [1,0,0,1]}])
+            self.assertEqual(arrays.vertex_data, [{}, {}, {}, {}])
+
+    def test_to_arrays(self):
+        f = self.dc.newFace(np.array([1,1]), coords=np.array([[0,0],[2,0],[2,2],[0,2]]))
+        self.dc.createEdge(np.array([5,5]), np.array([6,6]))
+        arrays = self.dc.to_arrays()
+        self.assertIsInstance(arrays, dcel.DCELArrays)
+        self.assertEqual(arrays.counts(), (6, 10, 1))
+        self.assertEqual(arrays.coords.shape, (6,2))
+        self.assertEqual(arrays.origin.dtype, np.int32)
+        self.assertEqual(arrays.face_lengths().tolist(), [4])
+        twinned = arrays.twin >= 0
+        self.assertTrue((arrays.origin[arrays.twin[twinned]] == arrays.edge_ends()[twinned]).all())
+        polygon = arrays.face_polygons()[0]
+        self.assertTrue(np.allclose(polygon, np.array([x.origin.loc for x in f.edgeList])))
+        centroids, areas = arrays.face_centroids()
+        self.assertTrue(np.allclose(centroids[0], np.array([1,1])))
+        self.assertTrue(np.allclose(np.abs(areas), [4]))
+
+    def test_arrays_bulk(self):
+        self.dc.newFace(np.array([1,1]), coords=np.array([[0,0],[2,0],[2,2],[0,2]]))
+        self.dc.createEdge(np.array([5,5]), np.array([60,60]))
+        arrays = self.dc.to_arrays()
+        bbox = np.array([-1,-1,10,10])
+        self.assertEqual(arrays.vertices_within(bbox).sum(), 5)
+        self.assertEqual(arrays.edges_within(bbox).sum(), 8)
+        self.assertEqual(arrays.faces_within(bbox).tolist(), [True])
+        original = {x.index : x.loc.copy() for x in self.dc.vertices}
+        arrays.transform(matrix=np.array([[0,-1],[1,0]]), translate=np.array([10,0]))
+        self.dc.update_from_arrays(arrays)
+        for x in self.dc.vertices:
+            expected = np.array([10 - original[x.index][1], original[x.index][0]])
+            self.assertTrue(np.allclose(x.loc, expected))
+        self.assertTrue(all([np.allclose(x.site, [9,1]) for x in self.dc.faces]))
+
+    def test_arrays_round_trip(self):
+        self.dc.newFace(np.array([1,1]), coords=np.array([[0,0],[2,0],[2,2],[0,2]]),
+                        data={dcel.FaceE.FILL : [1,0,0,1]})
+        self.dc.createEdge(np.array([5,5]), np.array([6,6]), vdata={"a": 2})
+        rebuilt = dcel.DCEL.from_arrays(self.dc.to_arrays())
+        for key in ['vertices', 'halfEdges', 'faces']:
+            original = sorted(self.dc.export_data()[key], key=lambda x: x['i'])
+            result = sorted(rebuilt.export_data()[key], key=lambda x: x['i'])
+            for x in original + result:
+                if 'halfEdges' in x:
+                    x['halfEdges'] = sorted(x['halfEdges'])
+            self.assertEqual(original, result)
+
     def test_force_edge_lengths(self):
         e = self.dc.createEdge(np.array([0,0]), np.array([10,0]))
         self.assertEqual(e.getLength_sq(), (pow(10,2)))
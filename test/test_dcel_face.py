@@ -1,4 +1,5 @@
 import unittest
+import tracemalloc
 import logging
 import numpy as np
 import IPython
@@ -10,6 +11,8 @@ from cairo_utils import dcel
 from cairo_utils.math import get_distance_raw
 from cairo_utils.dcel.constants import EditE
 
+FACE_BYTES = 200
+
 class DCEL_FACE_Tests(unittest.TestCase):
     def setUp(self):
         self.dc = dcel.DCEL()
@@ -30,6 +33,30 @@ class DCEL_FACE_Tests(unittest.TestCase):
         self.assertIsNotNone(f)
         self.assertIsInstance(f, dcel.Face)
 
+    def test_slots(self):
+        self.assertFalse(hasattr(self.f, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.f.other = 5
+
+    def test_lazy_containers(self):
+        f = dcel.Face()
+        self.assertIsNone(f._data)
+        self.assertIsNone(f._edgeList)
+        self.assertIsNone(f._free_vertices)
+        self.assertFalse(f.has_edges())
+        self.assertEqual(f.edgeList, [])
+        self.assertEqual(len(self.f.edgeList), 4)
+
+    def test_memory(self):
+        """ Faces, without their site arrays, fit in FACE_BYTES """
+        sites = [np.array([x, x]) for x in range(1000)]
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        faces = [dcel.Face(site=x) for x in sites]
+        used = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+        self.assertLess(used / len(faces), FACE_BYTES)
+
     def test_hull_creation(self):
         """ Test construction of a hull from a set of vertices """ 
         #A Set of Vertices:
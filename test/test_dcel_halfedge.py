@@ -1,4 +1,5 @@
 import unittest
+import tracemalloc
 import logging
 import IPython
 import numpy as np
@@ -8,6 +9,8 @@ from cairo_utils import dcel
 from cairo_utils.dcel.constants import EditE
 from math import radians
 
+HALFEDGE_BYTES = 240
+
 
 class DCEL_HALFEDGE_Tests(unittest.TestCase):
     def setUp(self):
@@ -29,6 +32,25 @@ class DCEL_HALFEDGE_Tests(unittest.TestCase):
         self.assertIsInstance(self.he, dcel.HalfEdge)
         self.assertIsInstance(self.e, dcel.HalfEdge)
 
+    def test_slots(self):
+        self.assertFalse(hasattr(self.he, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.he.other = 5
+
+    def test_lazy_data(self):
+        self.assertIsNone(self.he._data)
+        self.he.data["a"] = 2
+        self.assertEqual(self.he.data, {"a": 2})
+
+    def test_memory(self):
+        """ HalfEdges fit in HALFEDGE_BYTES """
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        edges = [dcel.HalfEdge() for x in range(1000)]
+        used = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+        self.assertLess(used / len(edges), HALFEDGE_BYTES)
+
     
     def test_export_import(self):
         """ Check the exported fieldnames """
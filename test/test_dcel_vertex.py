@@ -1,4 +1,5 @@
 import unittest
+import tracemalloc
 import logging
 import numpy as np
 from math import radians
@@ -10,6 +11,8 @@ import IPython
 #IPython.embed(simple_prompt=True)
 #in shell: ipython --simple-prompty --matplotlib
 
+VERTEX_BYTES = 200
+
 class DCEL_VERTEX_Tests(unittest.TestCase):
     def setUp(self):
         self.dc = dcel.DCEL()
@@ -35,6 +38,30 @@ class DCEL_VERTEX_Tests(unittest.TestCase):
         self.assertEqual(self.v.loc[1], 0.6)
         self.assertEqual(self.v.data["Test"], 5)
 
+    def test_slots(self):
+        self.assertFalse(hasattr(self.v, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.v.other = 5
+
+    def test_lazy_containers(self):
+        v = dcel.Vertex(np.array([1, 1]))
+        self.assertIsNone(v._data)
+        self.assertIsNone(v._halfEdges)
+        self.assertTrue(v.isEdgeless())
+        self.assertIsNone(v._halfEdges)
+        v.data["a"] = 2
+        self.assertEqual(v.data, {"a": 2})
+
+    def test_memory(self):
+        """ Vertices, without their loc arrays, fit in VERTEX_BYTES """
+        locs = [np.array([x, x]) for x in range(1000)]
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        verts = [dcel.Vertex(x) for x in locs]
+        used = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+        self.assertLess(used / len(verts), VERTEX_BYTES)
+
     def test_dcel_created_vertex(self):
         """ Create a vertex through the dcel """
         aDCVert = self.dc.newVertex(np.array([0.2, 0.6]), data={"Test": 5})
@@ -94,7 +94,28 @@ class CUMath_Tests(unittest.TestCase):
             self.assertTrue(np.allclose(radius, np.array([1])))
             self.assertTrue(np.allclose(centre, np.array([0,0])))
 
-        
+    def test_get_circle_3p_collinear(self):
+        xys = np.array([[0,0],[1,1],[2,2]])
+        self.assertIsNone(cumath.get_circle_3p(*xys))
+
+    #circumcircles
+    def test_circumcircles(self):
+        rand = np.random.random((100,3)) * TWOPI
+        radii = 1 + np.random.random((100,1))
+        offsets = np.random.random((100,1,2))
+        triples = np.stack((np.cos(rand), np.sin(rand)), axis=2) * radii[:,:,None] + offsets
+        centres, result_radii = cumath.circumcircles(triples)
+        self.assertEqual(centres.shape, (100,2))
+        self.assertTrue(np.allclose(centres, offsets[:,0]))
+        self.assertTrue(np.allclose(result_radii, radii[:,0]))
+
+    def test_circumcircles_collinear(self):
+        triples = np.array([[[0,0],[1,1],[2,2]], [[0,0],[1,0],[0,1]]], dtype=float)
+        centres, radii = cumath.circumcircles(triples)
+        self.assertTrue(np.isnan(radii[0]))
+        self.assertTrue(np.allclose(centres[1], np.array([0.5, 0.5])))
+
+
     
     #extend_line
     def test_extend_line(self):
@@ -231,6 +252,13 @@ class CUMath_Tests(unittest.TestCase):
     #isClockwise
     def test_isClockwise(self):
         return
+
+    #are_clockwise
+    def test_are_clockwise(self):
+        triples = np.random.random((100,3,2))
+        result = cumath.are_clockwise(triples)
+        self.assertEqual(result.shape, (100,))
+        self.assertTrue(all([a == cumath.is_clockwise(*x) for a, x in zip(result, triples)]))
     
     #getMinRangePair
     def test_getMinRangePair(self):
@@ -266,6 +294,17 @@ class CUMath_Tests(unittest.TestCase):
         self.assertTrue((lines[1] == np.array([1,4,3,4])).all())
         self.assertTrue((lines[2] == np.array([1,2,1,4])).all())
         self.assertTrue((lines[3] == np.array([3,2,3,4])).all())
+
+    #polygon_centroids
+    def test_polygon_centroids(self):
+        square = np.array([[0,0],[2,0],[2,2],[0,2]])
+        triangle = np.array([[0,0],[3,0],[0,3]])
+        line = np.array([[0,0],[1,1]])
+        xys = np.row_stack((square, triangle, line)).astype(float)
+        centroids, areas = cumath.polygon_centroids(xys, [4, 3, 2])
+        self.assertEqual(centroids.shape, (3,2))
+        self.assertTrue(np.allclose(centroids, np.array([[1,1],[1,1],[0.5,0.5]])))
+        self.assertTrue(np.allclose(areas, np.array([4, 4.5, 0])))
                         
         
     
@@ -1,7 +1,9 @@
 import unittest
 import logging
+from math import sqrt
 from test_context import cairo_utils as utils
 from cairo_utils import Parabola
+from cairo_utils.Parabola import BreakpointCache, breakpoint_x
 
 
 class Parabola_Tests(unittest.TestCase):
@@ -22,6 +24,42 @@ class Parabola_Tests(unittest.TestCase):
       #update_d
 
       #intersect
+      def test_intersect_updates_directrix(self):
+            p1 = Parabola(0, 1, 0.2)
+            p2 = Parabola(1, 0.5, 0.2)
+            xys = p1.intersect(p2, d=0)
+            self.assertEqual(p1.d, 0)
+            self.assertEqual(p2.d, 0)
+            self.assertEqual(len(xys), 2)
+            self.assertAlmostEqual(xys[0,0], 2 - sqrt(2.5))
+            self.assertAlmostEqual(xys[1,0], 2 + sqrt(2.5))
+
+      #breakpoint
+      def test_breakpoint_matches_intersect(self):
+            left = Parabola(0, 1, 0)
+            right = Parabola(1, 0.5, 0)
+            xs = left.intersect(right)[:,0]
+            #the higher left arc is cut from the left
+            self.assertAlmostEqual(left.breakpoint(right), xs[0])
+            self.assertAlmostEqual(right.breakpoint(left), xs[1])
+
+      def test_breakpoint_same_height(self):
+            self.assertAlmostEqual(breakpoint_x(0.2, 0.5, 0.6, 0.5, 0.1), 0.4)
+
+      def test_breakpoint_vertical(self):
+            self.assertEqual(breakpoint_x(0.2, 0.5, 0.6, 0.1, 0.1), 0.6)
+
+      def test_breakpoint_cache(self):
+            left = Parabola(0, 1, 0)
+            right = Parabola(1, 0.5, 0)
+            cache = BreakpointCache(0)
+            x = cache.get(left, right)
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(cache.get(left, right), x)
+            self.assertEqual(len(cache), 1)
+            cache.update_d(-0.5)
+            self.assertEqual(len(cache), 0)
+            self.assertAlmostEqual(cache.get(left, right), left.breakpoint(right, d=-0.5))
 
       #calcStandardForm
 
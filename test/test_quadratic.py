@@ -38,6 +38,13 @@ class Quadratic_Tests(unittest.TestCase):
       #discriminant
 
       #solve
+      def test_solve_linear(self):
+          q = Quadratic(0,2,-4)
+          self.assertEqual(q.solve(), [2, None])
+
+      def test_solve_double_root(self):
+          q = Quadratic(1,-2,1)
+          self.assertEqual(q.solve(), [1, None])
       
 
 if __name__ == "__main__":
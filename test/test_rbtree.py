@@ -1,9 +1,11 @@
 import unittest
 import logging
 import IPython
+import numpy as np
 from test_context import cairo_utils as utils
 from cairo_utils import rbtree
 from cairo_utils.rbtree import ComparisonFunctions as CompFuncs
+from cairo_utils.rbtree.operations import black_height, _split_nodes
 
 
 class RBTree_Tests(unittest.TestCase):
@@ -70,7 +72,212 @@ class RBTree_Tests(unittest.TestCase):
         self.assertEqual(m.value, 8)
         self.t.delete(m)
         self.assertEqual(len(self.t), 11)
-    
+
+    def test_delete_repeated(self):
+        nodes = self.t.insert(*range(100))
+        self.t.delete(*nodes[::2])
+        self.t.delete(nodes[0], nodes[2])
+        self.assertEqual(len(self.t), 50)
+        self.assertEqual([x.value for x in self.t.get_chain()], list(range(1,100,2)))
+        self.assertEqual(list(self.t.nodes), nodes[1::2])
+
+    def test_threaded_neighbours(self):
+        values = list(np.random.randint(0, 50, 200))
+        nodes = self.t.insert(*values)
+        self.t.delete(*nodes[::3])
+        chain = self.t.get_chain()
+        self.assertEqual([x.value for x in chain], sorted(values[1::3] + values[2::3]))
+        self.assertIsNone(chain[0].getPredecessor())
+        self.assertIsNone(chain[-1].getSuccessor())
+        for a, b in zip(chain, chain[1:]):
+            self.assertIs(a.getSuccessor(), b)
+            self.assertIs(b.getPredecessor(), a)
+
+    #order statistics
+    def test_rank_select(self):
+        self.t = rbtree.RBTree(track_sizes=True)
+        values = list(np.random.randint(0, 50, 200))
+        nodes = self.t.insert(*values)
+        self.t.delete(*nodes[::3])
+        chain = self.t.get_chain()
+        self.assertEqual(self.t.root.size, len(chain))
+        for i, node in enumerate(chain):
+            self.assertEqual(self.t.rank(node), i)
+            self.assertIs(self.t.select(i), node)
+        self.assertIsNone(self.t.select(len(chain)))
+
+    def test_count_range(self):
+        self.t = rbtree.RBTree(track_sizes=True)
+        values = list(np.random.randint(0, 50, 200))
+        nodes = self.t.insert(*values)
+        self.t.delete(*nodes[:50])
+        remaining = values[50:]
+        for lo, hi in [(0,50), (10,20), (20,10), (25,26), (-5, 100)]:
+            expected = len([x for x in remaining if lo <= x < hi])
+            self.assertEqual(self.t.count_range(lo, hi), expected)
+
+    #finger search
+    def test_search_hint(self):
+        nodes = self.t.insert(*range(0, 200, 2))
+        for hint in nodes[::7]:
+            for value in [0, 37, 38, 150, 198, -5, 500]:
+                self.assertEqual(self.t.search(value, hint=hint)[0],
+                                 self.t.search(value)[0])
+                self.assertEqual(self.t.search(value, hint=hint, closest=True)[0].value,
+                                 self.t.search(value, closest=True)[0].value)
+
+    def test_insert_hint(self):
+        nodes = self.t.insert(*range(0, 100, 10))
+        new_nodes = self.t.insert(41, 42, 43, 44, hint=nodes[4])
+        self.assertEqual([x.value for x in new_nodes], [41,42,43,44])
+        self.assertEqual([x.value for x in self.t],
+                         [0,10,20,30,40,41,42,43,44,50,60,70,80,90])
+        self.assertEqual(len(set(self.t.countBlackHeight())), 1)
+
+    #keyed trees
+    def test_key(self):
+        self.t = rbtree.RBTree(key=lambda x: (x[1], x[0]))
+        values = [(x, y) for x in range(5) for y in range(5)]
+        nodes = self.t.insert(*values)
+        self.assertEqual([x.value for x in self.t], sorted(values, key=lambda x: (x[1], x[0])))
+        self.assertEqual(nodes[7].key, (2, 1))
+        found, direction = self.t.search((3, 2))
+        self.assertEqual(found.value, (3,2))
+        self.assertIsNone(self.t.search((9, 9))[0])
+
+    def test_key_callbacks(self):
+        self.t = rbtree.RBTree(key=abs, track_sizes=True)
+        nodes = self.t.insert(-5, 3, -1, 4, -2)
+        self.assertEqual([x.value for x in self.t], [-1,-2,3,4,-5])
+        self.assertEqual(self.t.count_range(2, 5), 3)
+        self.assertEqual(self.t.search(-4, hint=nodes[0])[0].value, 4)
+        other = self.t.split(3)
+        self.assertEqual(other.search(5)[0].value, -5)
+
+    #iteration
+    def test_iter(self):
+        self.t.insert(4,2,6,5,2,7,8,4,2,5,2,1)
+        self.assertEqual([x.value for x in self.t], [1,2,2,2,2,4,4,5,5,6,7,8])
+        self.assertEqual(list(rbtree.RBTree()), [])
+
+    def test_iter_from(self):
+        nodes = self.t.insert(*range(10))
+        self.assertEqual([x.value for x in self.t.iter_from(nodes[6])], [6,7,8,9])
+        self.assertEqual([x.value for x in self.t.iter_from(nodes[3], reverse=True)], [3,2,1,0])
+
+    def test_iter_from_delete(self):
+        self.t.insert(*range(10))
+        for node in self.t:
+            if node.value % 2:
+                self.t.delete(node)
+        self.assertEqual([x.value for x in self.t], [0,2,4,6,8])
+
+    def test_iter_range(self):
+        self.t.insert(*range(0, 20, 2))
+        self.assertEqual([x.value for x in self.t.iter_range(3, 10)], [4,6,8])
+        self.assertEqual([x.value for x in self.t.iter_range(4, 11)], [4,6,8,10])
+        self.assertEqual(list(self.t.iter_range(30, 40)), [])
+        generator = self.t.iter_range(0, 20)
+        self.assertEqual(next(generator).value, 0)
+
+    #snapshots
+    def test_snapshot(self):
+        self.t = rbtree.RBTree(persistent=True)
+        nodes = self.t.insert(*range(10))
+        first = self.t.snapshot()
+        self.assertIsInstance(first, rbtree.Snapshot)
+        self.t.delete(*nodes[:5])
+        self.t.insert(20, 30)
+        second = self.t.snapshot()
+        self.assertEqual(list(first), list(range(10)))
+        self.assertEqual(list(second), [5,6,7,8,9,20,30])
+        self.assertEqual(second[5], 20)
+        self.assertEqual(second[-1], 30)
+        self.assertEqual(len(second), len(self.t))
+
+    def test_snapshot_split_join(self):
+        self.t = rbtree.RBTree.from_sorted(range(50), persistent=True)
+        before = self.t.snapshot()
+        other = self.t.split(20)
+        self.assertEqual(list(self.t.snapshot()), list(range(20)))
+        self.assertEqual(list(other.snapshot()), list(range(20,50)))
+        other.delete(other.min())
+        self.t.join(other)
+        self.assertEqual(list(self.t.snapshot()), [x.value for x in self.t])
+        self.assertEqual(list(before), list(range(50)))
+
+    #bulk operations
+    def test_from_sorted(self):
+        self.t = rbtree.RBTree.from_sorted(range(100), track_sizes=True)
+        self.assertEqual(len(self.t), 100)
+        self.assertEqual([x.value for x in self.t.get_chain()], list(range(100)))
+        self.assertEqual(len(set(self.t.countBlackHeight())), 1)
+        self.assertFalse(self.t.root.red)
+        self.assertEqual(self.t.select(42).value, 42)
+
+    def test_from_shape(self):
+        nodes = self.t.insert(*np.random.random(100))
+        self.t.delete(*nodes[:30])
+        values = [x.value for x in self.t]
+        parents, reds = self.t.get_shape()
+        other = rbtree.RBTree.from_shape(values, parents, reds, track_sizes=True)
+        self.assertEqual(len(other), 70)
+        self.assertEqual([x.value for x in other], values)
+        self.assertEqual(other.get_shape(), (parents, reds))
+        self.assertEqual(other.root.value, self.t.root.value)
+        self.assertEqual(len(set(other.countBlackHeight())), 1)
+        self.assertEqual(other.select(42).value, values[42])
+
+    def test_delete_black_height(self):
+        nodes = self.t.insert(*np.random.random(100))
+        self.t.delete(*nodes[:60])
+        self.assertEqual(len(set(self.t.countBlackHeight())), 1)
+
+    def test_split(self):
+        self.t = rbtree.RBTree.from_sorted(range(100))
+        other = self.t.split(30)
+        self.assertEqual([x.value for x in self.t.get_chain()], list(range(30)))
+        self.assertEqual([x.value for x in other.get_chain()], list(range(30,100)))
+        self.assertEqual((len(self.t), len(other)), (30, 70))
+        self.assertEqual(len(set(self.t.countBlackHeight())), 1)
+        self.assertEqual(len(set(other.countBlackHeight())), 1)
+        self.assertIsNone(self.t.max().getSuccessor())
+        self.assertIsNone(other.min().getPredecessor())
+
+    def test_split_black_heights(self):
+        #split irregular trees, checking the heights passed down through the joins:
+        values = np.random.RandomState(2).random_sample(200)
+        ordered = sorted(values)
+        for at in [0, 1, 57, 100, 199]:
+            self.t = rbtree.RBTree()
+            self.t.insert(*values)
+            (left, left_height), (right, right_height) = _split_nodes(self.t, self.t.root,
+                                                                      black_height(self.t.root),
+                                                                      ordered[at], self.t.cmpFunc, None)
+            self.assertEqual(left_height, black_height(left))
+            self.assertEqual(right_height, black_height(right))
+            self.t = rbtree.RBTree()
+            self.t.insert(*values)
+            other = self.t.split(ordered[at])
+            self.assertEqual([x.value for x in self.t.get_chain()], ordered[:at])
+            self.assertEqual([x.value for x in other.get_chain()], ordered[at:])
+            for tree in [self.t, other]:
+                if tree.root is not None:
+                    self.assertFalse(tree.root.red)
+                    self.assertEqual(len(set(tree.countBlackHeight())), 1)
+            self.t.join(other)
+            self.assertEqual([x.value for x in self.t.get_chain()], ordered)
+            self.assertEqual(len(set(self.t.countBlackHeight())), 1)
+
+    def test_join(self):
+        self.t.insert(*range(10))
+        other = rbtree.RBTree.from_sorted(range(10, 100))
+        self.t.join(other)
+        self.assertEqual(len(self.t), 100)
+        self.assertEqual(len(other), 0)
+        self.assertEqual([x.value for x in self.t.get_chain()], list(range(100)))
+        self.assertEqual(len(set(self.t.countBlackHeight())), 1)
+
     #search
     def test_search(self):
         self.t.insert(4,2,6,5,2,7,8,4,2,5,2,1)
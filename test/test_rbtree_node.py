@@ -23,6 +23,20 @@ class RBTree_Tests(unittest.TestCase):
         self.assertIsNone(self.n.parent)
         self.assertTrue(self.n.red)
 
+    def test_slots(self):
+        self.assertFalse(hasattr(self.n, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.n.other = 5
+
+    def test_lazy_data(self):
+        self.assertIsNone(self.n._data)
+        self.n.data['a'] = 5
+        self.assertEqual(self.n.data, {'a': 5})
+        base = {'b': 2}
+        n2 = Node(3, data=base)
+        n2.data['c'] = 3
+        self.assertEqual(base, {'b': 2})
+
     def test_eq(self):
         self.assertTrue(self.n == self.n)
         other = Node(2)
@@ -0,0 +1,69 @@
+import unittest
+import logging
+import numpy as np
+from test_context import cairo_utils as utils
+from cairo_utils import trace
+from cairo_utils import rbtree
+from cairo_utils.dcel import DCEL
+
+
+class Trace_Tests(unittest.TestCase):
+
+    def setUp(self):
+        trace.reset()
+
+    def tearDown(self):
+        trace.disable()
+        trace.reset()
+
+    #----------
+    def test_disabled_by_default(self):
+        self.assertFalse(trace.ENABLED)
+        t = rbtree.RBTree()
+        t.insert(1,2,3)
+        t.search(2)
+        self.assertEqual(len(trace.counters), 0)
+
+    def test_enabled_counts(self):
+        trace.enable(log=False)
+        t = rbtree.RBTree()
+        t.insert(1,2,3)
+        t.search(2)
+        self.assertEqual(trace.counters["rbtree.search"], 4)
+        self.assertEqual(trace.counters["rbtree.insert_successor"]
+                         + trace.counters["rbtree.insert_predecessor"], 3)
+
+    def test_hooks(self):
+        found = []
+        trace.enable(log=False)
+        trace.add_hook(lambda n, d: found.append(d), name="dcel.newVertex")
+        dc = DCEL()
+        v1 = dc.newVertex(np.array([0,0]))
+        v2 = dc.newVertex(np.array([0,0]))
+        self.assertIs(v1, v2)
+        self.assertEqual(len(found), 2)
+        self.assertFalse(found[0]['reused'])
+        self.assertTrue(found[1]['reused'])
+
+    def test_all_event_hook(self):
+        names = []
+        hook = lambda n, d: names.append(n)
+        trace.enable(log=False)
+        trace.add_hook(hook)
+        dc = DCEL()
+        dc.newVertex(np.array([0,0]))
+        trace.remove_hook(hook)
+        dc.newVertex(np.array([1,1]))
+        self.assertEqual(names, ["vertex.new", "dcel.newVertex"])
+
+
+if __name__ == "__main__":
+      #use python $filename to use this logging setup
+      LOGLEVEL = logging.INFO
+      logFileName = "log.trace_tests"
+      logging.basicConfig(filename=logFileName, level=LOGLEVEL, filemode='w')
+      console = logging.StreamHandler()
+      console.setLevel(logging.WARN)
+      logging.getLogger().addHandler(console)
+      unittest.main()
+      #reminder: user logging.getLogger().setLevel(logging.NOTSET) for log control
@@ -14,18 +14,57 @@ class Tree_Tests(unittest.TestCase):
 
       #----------
       #creation
+      def test_creation(self):
+            t = Tree(5, root=True)
+            self.assertTrue(t.isRoot())
+            self.assertTrue(t.isLeaf())
+            b = Tree(5, balanced=True)
+            self.assertTrue(b.isLeaf())
 
       #isLeaf
 
       #isRoot
 
       #insert
+      def test_insert_sorted(self):
+            """ Sorted input is deeper than the recursion limit when unbalanced """
+            for balanced in [False, True]:
+                  t = Tree(0, balanced=balanced)
+                  for x in range(1, 2000):
+                        t.insert(x, data=x * 2)
+                  self.assertFalse(t.isLeaf())
+                  self.assertEqual(t.search(1234).data, 2468)
 
       #str
 
       #search
+      def test_search(self):
+            for balanced in [False, True]:
+                  t = Tree(5, balanced=balanced)
+                  for x in [3, 8, 1, 4, 9]:
+                        t.insert(x)
+                  self.assertEqual(t.search(4).value, 4)
+                  self.assertEqual(t.search(5).value, 5)
+                  self.assertIsNone(t.search(7))
 
       #getRange
+      def test_getRange(self):
+            values = [50, 20, 80, 10, 30, 70, 90, 30]
+            for balanced in [False, True]:
+                  t = Tree(values[0], balanced=balanced)
+                  for x in values[1:]:
+                        t.insert(x)
+                  self.assertEqual([x.value for x in t.getRange(20, 70)], [30, 30, 50, 70])
+                  self.assertEqual([x.value for x in t.getRange(95, 100)], [])
+
+      def test_iter_range(self):
+            for balanced in [False, True]:
+                  t = Tree(0, balanced=balanced)
+                  for x in range(1, 2500):
+                        t.insert(x)
+                  generator = t.iter_range(1000, 2000)
+                  self.assertEqual(next(generator).value, 1001)
+                  self.assertEqual(len(list(generator)), 999)
       
 
 if __name__ == "__main__":
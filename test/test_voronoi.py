@@ -0,0 +1,229 @@
+import unittest
+import logging
+import pickle
+from os import remove
+from os.path import isfile
+import numpy as np
+from test_context import cairo_utils as utils
+from cairo_utils.dcel.voronoi import Voronoi
+from cairo_utils.dcel.voronoi.voronoi import FINALISE_MARGIN
+from cairo_utils.dcel import HalfEdge
+from cairo_utils.rbtree import Node
+
+BBOX = np.array([0,0,1000,1000])
+
+def make_sites(n, seed=5, bbox=BBOX):
+    rng = np.random.RandomState(seed)
+    return bbox[:2] + rng.random_sample((n,2)) * (bbox[2:] - bbox[:2])
+
+def sorted_locs(dc):
+    locs = np.array([x.loc for x in dc.vertices])
+    return locs[np.lexsort((locs[:,1], locs[:,0]))]
+
+class Voronoi_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.v = Voronoi(bbox=BBOX)
+
+    def tearDown(self):
+        self.v = None
+
+    def calculate(self, sites, v=None):
+        if v is None:
+            v = self.v
+        v.initGraph(data=sites, rerun=True)
+        v.calculate_to_completion()
+        return v.finalise_DCEL()
+
+    #----------
+    def test_creation(self):
+        self.assertIsNotNone(self.v)
+        self.assertIsInstance(self.v, Voronoi)
+
+    def test_smoke(self):
+        sites = make_sites(50)
+        dc = self.calculate(sites)
+        self.assertFalse(bool(self.v.events))
+        self.assertEqual(len(self.v.sites), 50)
+        self.assertTrue(0 < len(dc.faces) <= 50)
+        self.assertTrue(bool(dc.vertices))
+        self.assertTrue(bool(dc.halfEdges))
+        bounds = BBOX + FINALISE_MARGIN
+        for vert in dc.vertices:
+            self.assertTrue(np.all(bounds[:2] - 1 <= vert.loc))
+            self.assertTrue(np.all(vert.loc <= bounds[2:] + 1))
+
+    def test_lazy_arcs_match_eager(self):
+        sites = make_sites(100, seed=3)
+        eager = self.calculate(sites)
+        lazy_v = Voronoi(bbox=BBOX, lazy_arcs=True)
+        lazy = self.calculate(sites, v=lazy_v)
+        self.assertEqual(len(eager.vertices), len(lazy.vertices))
+        self.assertEqual(len(eager.halfEdges), len(lazy.halfEdges))
+        self.assertEqual(len(eager.faces), len(lazy.faces))
+        self.assertTrue(np.allclose(sorted_locs(eager), sorted_locs(lazy), atol=1e-8))
+
+    def test_initGraph_duplicates(self):
+        sites = np.array([[100.0, 200.0],
+                          [300.0, 400.0],
+                          [100.0, 200.0],
+                          [0.0, 500.0],
+                          [-0.0, 500.0],
+                          [300.0, 400.0 + 1e-9],
+                          [300.0, 400.0]])
+        self.v.initGraph(data=sites, rerun=True)
+        #exact duplicates are skipped, keeping the first in input order,
+        #near duplicates are kept:
+        expected = sites[[0, 1, 3, 5]]
+        self.assertEqual(len(self.v.sites), len(expected))
+        self.assertEqual(len(self.v.dcel.faces), len(expected))
+        for site, loc in zip(self.v.sites, expected):
+            self.assertEqual(site.loc.tolist(), loc.tolist())
+            self.assertEqual(site.face.site.tolist(), loc.tolist())
+
+    def test_initGraph_event_order(self):
+        #a grid gives sites at the same y, which pop in the order given:
+        coords = np.linspace(50, 950, 10)
+        sites = np.array([[x, y] for x in coords for y in coords])
+        self.v.initGraph(data=sites, rerun=True)
+        expected = sites[np.argsort(-sites[:,1], kind='stable')]
+        for loc in expected:
+            self.assertEqual(self.v.events.pop().loc.tolist(), loc.tolist())
+        self.assertFalse(bool(self.v.events))
+
+    def test_breakpoint_edges(self):
+        a, b, c = Node(0), Node(1), Node(2)
+        e1, e2 = HalfEdge(), HalfEdge()
+        self.assertIsNone(self.v._getEdge(a, b))
+        self.v._storeEdge(e1, a, b)
+        self.v._storeEdge(e2, b, c)
+        self.assertIs(self.v._getEdge(a, b), e1)
+        self.assertIs(self.v._getEdge(b, c), e2)
+        #only stored for the left to right pair:
+        self.assertIsNone(self.v._getEdge(b, a))
+        self.assertIsNone(self.v._getEdge(a, c))
+        self.assertIsNone(self.v._getEdge(None, a))
+        #restoring the same edge is fine, overwriting isn't:
+        self.v._storeEdge(e1, a, b)
+        with self.assertRaises(Exception):
+            self.v._storeEdge(e2, a, b)
+        self.v._removeEdge(a, b)
+        self.assertFalse(self.v._hasEdge(a, b))
+        self.assertIs(self.v._getEdge(b, c), e2)
+        with self.assertRaises(Exception):
+            self.v._removeEdge(a, b)
+        #a stale entry for a replaced neighbour isn't returned:
+        self.v._storeEdge(e1, a, b)
+        self.assertIsNone(self.v._getEdge(a, c))
+        self.v._removeEdge(a, b)
+        self.v._storeEdge(e1, a, c)
+        self.assertIs(self.v._getEdge(a, c), e1)
+        self.assertIsNone(self.v._getEdge(a, b))
+
+    def test_relax_until_max_iter(self):
+        self.v.initGraph(data=make_sites(60, seed=4), rerun=True)
+        self.v.calculate_to_completion()
+        iterations, displacement = self.v.relax_until(tol=0, max_iter=3)
+        self.assertEqual(iterations, 3)
+        self.assertGreater(displacement, 0)
+        self.assertTrue(self.v.finalised)
+        self.assertFalse(bool(self.v.events))
+
+    def test_relax_until_tol(self):
+        self.v.initGraph(data=make_sites(60, seed=4), rerun=True)
+        self.v.calculate_to_completion()
+        iterations, displacement = self.v.relax_until(tol=10, max_iter=50)
+        self.assertLess(iterations, 50)
+        self.assertGreater(iterations, 0)
+        self.assertLess(displacement, 10)
+        #already within tolerance:
+        self.assertEqual(self.v.relax_until(tol=10, max_iter=50)[0], 0)
+
+    def test_relax_until_finalised(self):
+        self.v.initGraph(data=make_sites(60, seed=4), rerun=True)
+        self.v.calculate_to_completion()
+        self.v.finalise_DCEL()
+        #finalising again changes nothing
+        num_edges = len(self.v.dcel.halfEdges)
+        self.assertIs(self.v.finalise_DCEL(), self.v.dcel)
+        self.assertEqual(len(self.v.dcel.halfEdges), num_edges)
+        self.assertEqual(self.v.relax_until(tol=0, max_iter=2)[0], 2)
+
+    def test_relax_until_decreases(self):
+        self.v.initGraph(data=make_sites(40, seed=2), rerun=True)
+        self.v.calculate_to_completion()
+        #each call continues from the last, leaving the diagram finalised
+        displacements = [self.v.relax_until(tol=0, max_iter=1, amnt=0.5)[1] for x in range(8)]
+        for a, b in zip(displacements, displacements[1:]):
+            self.assertLess(b, a)
+        self.assertLess(displacements[-1], 0.25 * displacements[0])
+
+    def resume(self, sites, step):
+        """ Calculate up to step, then resume in a new Voronoi from an exported checkpoint """
+        first = Voronoi(bbox=BBOX, max_steps=step)
+        first.initGraph(data=sites, rerun=True)
+        first.calculate_to_completion()
+        self.assertTrue(bool(first.events))
+        data = pickle.loads(pickle.dumps(first.export_checkpoint()))
+        resumed = Voronoi(bbox=BBOX)
+        resumed.import_checkpoint(data)
+        self.assertEqual(resumed.current_step, step)
+        resumed.calculate_to_completion()
+        return resumed
+
+    def assertSameDCEL(self, a, b):
+        self.assertEqual(len(a.vertices), len(b.vertices))
+        self.assertEqual(len(a.halfEdges), len(b.halfEdges))
+        self.assertEqual(len(a.faces), len(b.faces))
+        self.assertTrue(np.allclose(sorted_locs(a), sorted_locs(b)))
+
+    def test_checkpoint_resume(self):
+        sites = make_sites(100, seed=5)
+        expected = self.calculate(sites)
+        for step in [1, 10, 60, 150, 250]:
+            resumed = self.resume(sites, step)
+            self.assertSameDCEL(expected, resumed.finalise_DCEL())
+
+    def test_checkpoint_resume_tree_shape(self):
+        #arc searches here depend on the shape of the beachline
+        sites = make_sites(400, seed=6)
+        self.v.initGraph(data=sites, rerun=True)
+        self.v.calculate_to_completion()
+        resumed = self.resume(sites, 5)
+        self.assertSameDCEL(self.v.dcel, resumed.dcel)
+
+    def test_checkpoint_resume_equal_events(self):
+        #sites on a grid give events that compare equal
+        coords = np.linspace(50, 950, 10)
+        sites = np.array([[x, y] for x in coords for y in coords])
+        self.v.initGraph(data=sites, rerun=True)
+        self.v.calculate_to_completion()
+        for step in [1, 25, 90, 180]:
+            resumed = self.resume(sites, step)
+            self.assertSameDCEL(self.v.dcel, resumed.dcel)
+
+    def test_checkpoint_file(self):
+        filename = "voronoi_checkpoint_test.pkl"
+        sites = make_sites(50, seed=2)
+        expected = self.calculate(sites)
+        first = Voronoi(bbox=BBOX, max_steps=100)
+        first.initGraph(data=sites, rerun=True)
+        first.calculate_to_completion(checkpoint=filename, checkpoint_steps=40)
+        self.assertTrue(isfile(filename))
+        resumed = Voronoi(bbox=BBOX)
+        resumed.load_checkpoint(filename)
+        remove(filename)
+        self.assertEqual(resumed.current_step, 80)
+        resumed.calculate_to_completion()
+        self.assertSameDCEL(expected, resumed.finalise_DCEL())
+
+
+if __name__ == "__main__":
+      #use python $filename to use this logging setup
+      LOGLEVEL = logging.INFO
+      logFileName = "log.voronoi_tests"
+      logging.basicConfig(filename=logFileName, level=LOGLEVEL, filemode='w')
+      console = logging.StreamHandler()
+      console.setLevel(logging.WARN)
+      logging.getLogger().addHandler(console)
+      unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+import logging
+import heapq
+import numpy as np
+from test_context import cairo_utils as utils
+from cairo_utils import rbtree
+from cairo_utils.dcel.voronoi.Events import EventQueue, VEvent, CircleEvent
+
+
+class EventQueue_Tests(unittest.TestCase):
+
+    def setUp(self):
+        VEvent.offset = 1
+        self.q = EventQueue(compact_ratio=0.5, compact_min=4)
+
+    def tearDown(self):
+        self.q = None
+
+    def make_events(self, n, ys=None):
+        if ys is None:
+            ys = np.linspace(0, 1, n)
+        t = rbtree.RBTree()
+        nodes = t.insert(*range(n))
+        return [CircleEvent(np.array([0, y]), node, np.array([0, y])) for node, y in zip(nodes, ys)]
+
+    #----------
+    def test_creation(self):
+        self.assertIsNotNone(self.q)
+        self.assertEqual(len(self.q), 0)
+        self.assertFalse(bool(self.q))
+        self.assertIsNone(self.q.pop())
+
+    def test_pop_order(self):
+        events = self.make_events(10)
+        self.q.extend(events[:5])
+        for x in events[5:]:
+            self.q.push(x)
+        self.assertEqual(len(self.q), 10)
+        #highest y first
+        popped = [self.q.pop() for x in range(10)]
+        self.assertEqual(popped, events[::-1])
+        self.assertFalse(bool(self.q))
+
+    def test_queued_flag(self):
+        events = self.make_events(3)
+        self.assertFalse(any([x.queued for x in events]))
+        self.q.push(events[0])
+        self.q.extend(events[1:])
+        self.assertTrue(all([x.queued for x in events]))
+        popped = self.q.pop()
+        self.assertFalse(popped.queued)
+        self.assertEqual(len([x for x in events if x.queued]), 2)
+
+    def test_pop_skips_cancelled(self):
+        events = self.make_events(5)
+        self.q.extend(events)
+        self.q.cancel(events[4])
+        self.q.cancel(events[2])
+        self.assertEqual(self.q.cancelled, 2)
+        self.assertEqual(len(self.q), 3)
+        self.assertEqual(list(self.q), [x for x in self.q.heap if x.active])
+        popped = [self.q.pop() for x in range(3)]
+        self.assertEqual(popped, [events[3], events[1], events[0]])
+        self.assertEqual(self.q.cancelled, 0)
+        self.assertIsNone(self.q.pop())
+
+    def test_cancel_unqueued(self):
+        event = self.make_events(1)[0]
+        self.q.cancel(event)
+        self.assertFalse(event.active)
+        self.assertEqual(self.q.cancelled, 0)
+        #cancelling twice only counts once
+        events = self.make_events(2)
+        self.q.extend(events)
+        self.q.cancel(events[0])
+        self.q.cancel(events[0])
+        self.assertEqual(self.q.cancelled, 1)
+
+    def test_compact_min(self):
+        events = self.make_events(6)
+        self.q.extend(events)
+        #above the ratio, but below the minimum:
+        for x in events[:3]:
+            self.q.cancel(x)
+        self.assertEqual(len(self.q.heap), 6)
+        self.assertEqual(self.q.cancelled, 3)
+        self.q.cancel(events[3])
+        self.assertEqual(len(self.q.heap), 2)
+        self.assertEqual(self.q.cancelled, 0)
+        self.assertFalse(any([x.queued for x in events[:4]]))
+        self.assertTrue(all([x.queued for x in events[4:]]))
+
+    def test_compact_ratio(self):
+        events = self.make_events(10)
+        self.q.extend(events)
+        #at the minimum, but not over the ratio:
+        for x in events[::2]:
+            self.q.cancel(x)
+        self.assertEqual(self.q.cancelled, 5)
+        self.assertEqual(len(self.q.heap), 10)
+        self.q.cancel(events[1])
+        self.assertEqual(self.q.cancelled, 0)
+        self.assertEqual(len(self.q.heap), 4)
+
+    def test_compact_keeps_heap_order(self):
+        rng = np.random.RandomState(2)
+        events = self.make_events(50, ys=rng.random_sample(50))
+        self.q.extend(events)
+        cancelled = set()
+        for i in rng.permutation(50)[:40]:
+            self.q.cancel(events[i])
+            cancelled.add(i)
+        self.assertLess(len(self.q.heap), 50)
+        heap = self.q.heap
+        for i in range(1, len(heap)):
+            self.assertFalse(heap[i] < heap[(i-1)//2])
+        popped = []
+        while bool(self.q):
+            popped.append(self.q.pop())
+        expected = sorted([x for i, x in enumerate(events) if i not in cancelled],
+                          key=lambda x: -x.y())
+        self.assertEqual(popped, expected)
+
+    def test_equal_y_pop_in_queued_order(self):
+        events = self.make_events(30, ys=np.repeat([0.2, 0.5, 0.8], 10))
+        order = np.random.RandomState(3).permutation(30)
+        self.q.extend([events[i] for i in order[:20]])
+        for i in order[20:]:
+            self.q.push(events[i])
+        #compacts, reheapifying the remaining events:
+        for i in order[:16]:
+            self.q.cancel(events[i])
+        self.assertEqual(self.q.cancelled, 0)
+        expected = sorted([events[i] for i in order[16:]], key=lambda x: -x.y())
+        self.assertEqual([self.q.pop() for x in range(14)], expected)
+
+    def test_restore(self):
+        events = self.make_events(20, ys=np.repeat([0.5, 0.2], 10))
+        self.q.extend(events[::-1])
+        self.q.cancel(events[3])
+        queued = sorted(self.q.heap)
+        expected = [self.q.pop() for x in range(19)]
+        other = EventQueue(compact_ratio=0.5, compact_min=4)
+        other.restore(queued)
+        self.assertEqual(other.cancelled, 1)
+        self.assertEqual(len(other), 19)
+        self.assertTrue(all([x.queued for x in queued]))
+        #equal events pop in the same order as the original queue
+        self.assertEqual([other.pop() for x in range(19)], expected)
+
+    def test_clear(self):
+        events = self.make_events(5)
+        self.q.extend(events)
+        self.q.cancel(events[0])
+        self.q.clear()
+        self.assertEqual(len(self.q), 0)
+        self.assertEqual(self.q.cancelled, 0)
+        self.assertFalse(bool(self.q.heap))
+        self.assertFalse(any([x.queued for x in events]))
+        #cleared events can be queued again
+        self.q.extend(events[1:])
+        self.assertEqual(len(self.q), 4)
+
+
+if __name__ == "__main__":
+      #use python $filename to use this logging setup
+      LOGLEVEL = logging.INFO
+      logFileName = "log.voronoi_events_tests"
+      logging.basicConfig(filename=logFileName, level=LOGLEVEL, filemode='w')
+      console = logging.StreamHandler()
+      console.setLevel(logging.WARN)
+      logging.getLogger().addHandler(console)
+      unittest.main()
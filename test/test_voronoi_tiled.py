@@ -0,0 +1,92 @@
+import unittest
+import logging
+import numpy as np
+from test_context import cairo_utils as utils
+from cairo_utils.dcel.voronoi import Voronoi, tiled_voronoi, stitch_tiles
+from cairo_utils.dcel.voronoi.voronoi import FINALISE_MARGIN
+from test_voronoi import make_sites, BBOX
+
+BOUNDS = BBOX + FINALISE_MARGIN
+CORNERS = BOUNDS[[0,1,2,1,2,3,0,3]].reshape((4,2))
+
+def vertex_coords(dc):
+    """ The vertex coordinates of a dcel, except the corners of the outer bounds """
+    coords = np.array([x.loc for x in dc.vertices])
+    corners = np.isclose(coords[:,None,:], CORNERS[None,:,:]).all(axis=2).any(axis=1)
+    return coords[~corners]
+
+def inner_edges(dc):
+    """ The edges of a dcel not on the outer bounds, as pairs of rounded coordinates """
+    edges = set()
+    for edge in dc.halfEdges:
+        verts = edge.getVertices()
+        if None in verts:
+            continue
+        coords = [tuple(np.round(x.loc, 5)) for x in verts]
+        if any([np.isclose(x, BOUNDS[:2]).any() or np.isclose(x, BOUNDS[2:]).any()
+                for x in coords]):
+            continue
+        edges.add(tuple(sorted(coords)))
+    return edges
+
+class Voronoi_Tiled_Tests(unittest.TestCase):
+
+    def single_sweep(self, sites):
+        voronoi = Voronoi(bbox=BBOX)
+        voronoi.initGraph(data=sites, rerun=True)
+        voronoi.calculate_to_completion()
+        return voronoi.finalise_DCEL()
+
+    def assertMatchesSingleSweep(self, sites, **kwargs):
+        expected = self.single_sweep(sites)
+        tiled = tiled_voronoi(sites, bbox=BBOX, **kwargs)
+        #the outer bounds are completed per diagram, which can differ at their corners,
+        #and in how the faces along them are closed
+        a = vertex_coords(expected)
+        b = vertex_coords(tiled)
+        self.assertEqual(len(a), len(b))
+        self.assertEqual(len(tiled.faces), len(expected.faces))
+        #every vertex has a match in the other diagram
+        distances = np.sqrt(((a[:,None,:] - b[None,:,:]) ** 2).sum(axis=2))
+        self.assertLess(distances.min(axis=0).max(), 1e-6)
+        self.assertLess(distances.min(axis=1).max(), 1e-6)
+        self.assertEqual(inner_edges(tiled), inner_edges(expected))
+        return tiled
+
+    #----------
+    def test_stitch_tiles(self):
+        cells = [(np.array([0.5, 0.5]), np.array([[0,0], [1,0], [1,1], [0,1]])),
+                 (np.array([1.5, 0.5]), np.array([[1,0], [2,0], [2,1], [1,1]]))]
+        dc = stitch_tiles(cells, bbox=np.array([0,0,2,1]))
+        self.assertEqual(len(dc.faces), 2)
+        self.assertEqual(len(dc.vertices), 6)
+        #the shared edge is a single pair of twins
+        self.assertEqual(len(dc.halfEdges), 14)
+
+    def test_matches_single_sweep(self):
+        self.assertMatchesSingleSweep(make_sites(300, seed=7), processes=1)
+
+    def test_border_sites(self):
+        #sites either side of, and on, the seams of the 2x2 tiles
+        rng = np.random.RandomState(3)
+        x_seam = np.column_stack((500 + rng.uniform(-5, 5, 40), rng.uniform(50, 950, 40)))
+        y_seam = np.column_stack((rng.uniform(50, 950, 40), 500 + rng.uniform(-5, 5, 40)))
+        inside = BOUNDS[:2] + make_sites(200, seed=11) * 0.8
+        sites = np.row_stack((inside, x_seam, y_seam,
+                              np.array([[500, 500], [500, 250], [750, 500]])))
+        self.assertMatchesSingleSweep(sites, processes=1)
+
+    def test_process_pool(self):
+        sites = make_sites(100, seed=2)
+        self.assertMatchesSingleSweep(sites, processes=2, tiles=(3,2))
+
+
+if __name__ == "__main__":
+      #use python $filename to use this logging setup
+      LOGLEVEL = logging.INFO
+      logFileName = "log.voronoi_tiled_tests"
+      logging.basicConfig(filename=logFileName, level=LOGLEVEL, filemode='w')
+      console = logging.StreamHandler()
+      console.setLevel(logging.WARN)
+      logging.getLogger().addHandler(console)
+      unittest.main()